@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Offline throughput check for the concurrent geocoding scheduler.
+Starts a local stub geocoder with artificial latency and reports requests/sec.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocoding import LatencyRecorder, create_session, geocode_concurrently
+from stub_geocoder import start_stub_geocoder
+from update_coordinates import get_coordinates_from_zip
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure geocoding throughput against a local stub.')
+    parser.add_argument('--zips', type=int, default=500, help='number of zip codes to geocode')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=0, help='client rate limit, 0 for unlimited')
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub response latency in seconds')
+    parser.add_argument('--max-rps', type=float, default=None, help='stub answers 429 above this rate')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stub answers that are 503')
+    args = parser.parse_args()
+
+    server, url = start_stub_geocoder(latency=args.latency, max_rps=args.max_rps, error_rate=args.error_rate)
+    zips = [f"{i:05d}" for i in range(10000, 10000 + args.zips)]
+    session = create_session(args.workers)
+    latency = LatencyRecorder()
+
+    run = geocode_concurrently(
+        zips,
+        lambda zip_code: get_coordinates_from_zip(zip_code, url, session=session, latency=latency),
+        workers=args.workers,
+        rate=args.rate or None,
+        burst=args.burst
+    )
+    server.shutdown()
+
+    sequential = args.zips * (args.latency + 1.0)
+    print(f"Geocoded {len(run.results)}/{args.zips} zips ({len(run.failed)} failed)")
+    print(f"{run.requests} requests in {run.elapsed:.2f}s = {run.requests_per_second:.1f} req/s "
+          f"({run.rate_limited} rate limited, stub saw {server.request_count})")
+    print(f"Request latency: {latency.summary()}")
+    print(f"Old sequential loop would take ~{sequential:.0f}s")
+
+if __name__ == "__main__":
+    main()
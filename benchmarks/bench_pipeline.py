@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Stage-by-stage benchmark of the coordinate update pipeline.
+For each CSV size, times extract_zip_codes_from_csv, load_existing_coordinates,
+the geocoding loop (against a local stub with latency, 503s and 429s) and
+save_coordinates, with peak traced memory per stage. Each size is run
+--repeat times and stage timings are the medians. Results are saved as
+JSON; with --baseline, exits non-zero when a stage got slower than allowed.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint import CoordinateJournal, write_json_atomic
+from stub_geocoder import fake_coordinates, start_stub_geocoder
+from update_coordinates import (PendingResults, UpdateOptions, coordinate_entry, extract_zip_codes_from_csv,
+                                geocode_pending, get_coordinates_from_zip, load_existing_coordinates,
+                                save_coordinates)
+
+from bench_zip_extract import write_synthetic_csv
+
+STAGES = ['extract', 'load', 'geocode', 'save']
+
+class StageTimer:
+    """Wall time and peak traced memory of each stage"""
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        self.stages[name] = {'seconds': round(elapsed, 4),
+                             'peak_mb': round(peak / 1e6, 2) if peak is not None else None}
+
+def write_existing_coordinates(path: str, zip_codes: list):
+    coordinates = {}
+    for zip_code in zip_codes:
+        lat, lon = fake_coordinates(zip_code)
+        coordinates[zip_code] = {'latitude': lat, 'longitude': lon}
+    save_coordinates(path, coordinates, [])
+
+def run_size(rows: int, tmp: str, url: str, args) -> dict:
+    """Benchmark every stage on a CSV with this many rows"""
+    csv_path = os.path.join(tmp, f"synthetic_{rows}.csv")
+    json_path = os.path.join(tmp, f"coordinates_{rows}.json")
+    if not os.path.exists(csv_path):
+        write_synthetic_csv(csv_path, rows)
+    # Untimed pass: warms the page cache and picks the zips that will count as new
+    with contextlib.redirect_stdout(io.StringIO()):
+        all_zips = sorted(extract_zip_codes_from_csv(csv_path))
+        write_existing_coordinates(json_path, all_zips[min(args.new_zips, len(all_zips)):])
+
+    options = UpdateOptions(geocoder_url=url, workers=args.workers, rate=args.rate or None, burst=args.burst,
+                            cache_file=None, checkpoint_every=0, max_attempts=args.max_attempts)
+    timer = StageTimer(not args.no_memory)
+    if timer.trace_memory:
+        tracemalloc.start()
+    try:
+        with timer.stage('extract'), contextlib.redirect_stdout(io.StringIO()):
+            csv_zips = extract_zip_codes_from_csv(csv_path)
+        with timer.stage('load'), contextlib.redirect_stdout(io.StringIO()):
+            existing = load_existing_coordinates(json_path)
+        new_zips = csv_zips - set(existing)
+        results = PendingResults()
+        journal = CoordinateJournal(os.path.join(tmp, 'bench.journal'))
+        with timer.stage('geocode'), contextlib.redirect_stdout(io.StringIO()):
+            run, latency = geocode_pending(new_zips, get_coordinates_from_zip, coordinate_entry, journal, results,
+                                           options, checkpoint=lambda: None)
+        journal.remove()
+        with timer.stage('save'), contextlib.redirect_stdout(io.StringIO()):
+            save_coordinates(json_path, {**existing, **results.found}, sorted(results.failed),
+                             os.path.join(tmp, 'coordinates.bin') if args.binary else None)
+    finally:
+        if timer.trace_memory:
+            tracemalloc.stop()
+
+    total = sum(stage['seconds'] for stage in timer.stages.values())
+    return {
+        'rows': rows,
+        'csv_mb': round(os.path.getsize(csv_path) / 1e6, 1),
+        'unique_zips': len(csv_zips),
+        'new_zips': len(new_zips),
+        'stages': timer.stages,
+        'total_seconds': round(total, 4),
+        'rows_per_second': round(rows / total, 1),
+        'geocode': {
+            'found': len(results.found),
+            'failed': len(results.failed),
+            'retry_later': len(results.retry_later),
+            'requests': run.requests,
+            'rate_limited': run.rate_limited,
+            'requests_per_second': round(run.requests_per_second, 2),
+            'latency': latency.summary()
+        }
+    }
+
+def median_result(samples: list) -> dict:
+    """The first sample with every stage's seconds replaced by the median over all samples"""
+    result = dict(samples[0])
+    result['stages'] = {}
+    for name in STAGES:
+        peaks = [sample['stages'][name]['peak_mb'] for sample in samples]
+        result['stages'][name] = {
+            'seconds': round(statistics.median(sample['stages'][name]['seconds'] for sample in samples), 4),
+            'peak_mb': max(peaks) if None not in peaks else None,
+            'samples': [sample['stages'][name]['seconds'] for sample in samples]
+        }
+    result['total_seconds'] = round(sum(stage['seconds'] for stage in result['stages'].values()), 4)
+    result['rows_per_second'] = round(result['rows'] / result['total_seconds'], 1)
+    result['repeats'] = len(samples)
+    return result
+
+def print_result(result: dict):
+    print(f"\n{result['rows']:,} rows ({result['csv_mb']} MB, {result['unique_zips']} zips, "
+          f"{result['new_zips']} new), median of {result['repeats']}")
+    for name in STAGES:
+        stage = result['stages'][name]
+        memory = f"  peak {stage['peak_mb']:8.1f} MB" if stage['peak_mb'] is not None else ''
+        print(f"  {name:<8} {stage['seconds']:8.3f}s{memory}")
+    geocode = result['geocode']
+    print(f"  total    {result['total_seconds']:8.3f}s  {result['rows_per_second']:>12,.0f} rows/sec end to end")
+    print(f"  geocoder: {geocode['requests']} requests, {geocode['requests_per_second']} req/s, "
+          f"{geocode['rate_limited']} rate limited, {geocode['retry_later']} left for later; {geocode['latency']}")
+
+def find_regressions(results: list, baseline: dict, threshold: float, min_seconds: float) -> list:
+    """Stages slower than the baseline run of the same size by more than threshold (and min_seconds)"""
+    previous = {result['rows']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result['rows'])
+        if old is None:
+            continue
+        for name in STAGES:
+            new_seconds, old_seconds = result['stages'][name]['seconds'], old['stages'][name]['seconds']
+            if new_seconds > old_seconds * (1 + threshold) and new_seconds - old_seconds > min_seconds:
+                regressions.append(f"{result['rows']:,} rows / {name}: {old_seconds:.3f}s -> {new_seconds:.3f}s "
+                                   f"(+{(new_seconds / old_seconds - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the coordinate update pipeline.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='CSV sizes to run (e.g. 10000 100000 1000000 5000000)')
+    parser.add_argument('--new-zips', type=int, default=200, help='zip codes missing from the existing JSON')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=0, help='client rate limit, 0 for unlimited')
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.02, help='stub response latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of stub answers that are 503; their jittered retries make timings noisy, '
+                             'so leave at 0 for --baseline runs')
+    parser.add_argument('--seed', type=int, default=0, help='seed for stub errors and retry jitter, reset every run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size; stages are compared by their median')
+    parser.add_argument('--max-rps', type=float, default=None, help='stub answers 429 above this rate')
+    parser.add_argument('--binary', action='store_true', help='also write the binary artifact in the save stage')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip tracemalloc (its overhead inflates the timings)')
+    parser.add_argument('--output', default='bench_pipeline.json', help='where to save results')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown per stage as a fraction (default 0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='ignore slowdowns smaller than this, to keep tiny stages from flapping')
+    args = parser.parse_args()
+
+    server, url = start_stub_geocoder(latency=args.latency, max_rps=args.max_rps, error_rate=args.error_rate,
+                                      seed=args.seed)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in args.rows:
+                samples = []
+                for _ in range(max(args.repeat, 1)):
+                    server.random.seed(args.seed)
+                    random.seed(args.seed)
+                    samples.append(run_size(rows, tmp, url, args))
+                result = median_result(samples)
+                print_result(result)
+                results.append(result)
+    finally:
+        server.shutdown()
+
+    report = {
+        'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'results': results
+    }
+    write_json_atomic(args.output, report)
+    print(f"\nSaved results to {args.output} (process peak RSS {report['max_rss_mb']} MB)")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"❌ {len(regressions)} stage(s) regressed past {args.threshold:.0%} against {args.baseline}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"✅ No stage regressed past {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
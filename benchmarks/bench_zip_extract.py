@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for zip code extraction.
+Writes a synthetic multi-million-row CSV and compares the streaming extractor
+with the original csv.DictReader + re.match loop, in rows/sec.
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_ingest import extract_zip_codes, parallel_extract_zip_codes
+
+HEADER = ['name', 'housing_type', 'address', 'city', 'state', 'zip', 'phone', 'email']
+HOUSING_TYPES = ['Emergency Shelter', 'Transitional Housing', 'Permanent Supportive Housing', 'Rapid Re-Housing']
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 42):
+    """Write rows of realistic-looking organizations, including messy zip values"""
+    rng = random.Random(seed)
+    zip_pool = [f"{rng.randint(501, 99950):05d}" for _ in range(20000)]
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            zip_code = rng.choice(zip_pool)
+            roll = rng.random()
+            if roll < 0.02:
+                zip_code = f"{zip_code}-{rng.randint(0, 9999):04d}"
+            elif roll < 0.04:
+                zip_code = zip_code.lstrip('0')
+            elif roll < 0.05:
+                zip_code = ''
+            writer.writerow([
+                f"Organization {i}, Inc.", rng.choice(HOUSING_TYPES), f"{rng.randint(1, 9999)} Main St",
+                'Springfield', 'IL', zip_code, '(555) 555-0100', f"org{i}@example.org"
+            ])
+
+def legacy_extract(path: str) -> set:
+    """The original DictReader-based extraction, for comparison"""
+    unique_zips = set()
+    with open(path, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            zip_code = row.get('zip', '').strip()
+            if zip_code and re.match(r'^\d{5}$', zip_code.strip()):
+                unique_zips.add(zip_code)
+    return unique_zips
+
+def timed(label: str, rows: int, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.2f}s  {rows / elapsed:>12,.0f} rows/sec  {len(result):>6} zips")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark zip code extraction throughput.')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the streaming extractor')
+    parser.add_argument('--gzip', action='store_true', help='also time a gzip-compressed copy')
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help='also time the byte-range parallel extractor with these process counts')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.csv')
+        print(f"Writing {args.rows:,} synthetic rows...")
+        write_synthetic_csv(path, args.rows)
+        print(f"CSV size: {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+        if not args.skip_legacy:
+            timed('DictReader + re.match', args.rows, legacy_extract, path)
+        serial = timed('streaming extractor', args.rows, extract_zip_codes, [path])
+        for workers in args.workers:
+            parallel = timed(f"parallel extractor x{workers}", args.rows, parallel_extract_zip_codes, [path], workers)
+            if parallel != serial:
+                print(f"❌ parallel extractor x{workers} disagrees with the serial one")
+
+        if args.gzip:
+            gz_path = path + '.gz'
+            write_synthetic_csv(gz_path, args.rows)
+            timed('streaming extractor (.gz)', args.rows, extract_zip_codes, [gz_path])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Build stage: faceted inverted index over organizations.
+Every organization gets a stable integer ID, and each state and housing
+type maps to the sorted IDs carrying it plus precomputed counts, so filter
+combinations become sorted-list intersections and dropdowns can show
+counts without scanning the dataset.
+"""
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from build_organizations import read_organizations
+from checkpoint import write_json_atomic
+from csv_ingest import expand_csv_paths
+
+FACETS = ('state', 'type')
+IDENTITY_FIELDS = ('name', 'address', 'city', 'state', 'zip', 'type')
+
+def identity_key(org: Dict[str, str]) -> str:
+    return '|'.join(org[field].strip().lower() for field in IDENTITY_FIELDS)
+
+def load_id_registry(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'next_id': 0, 'ids': {}}
+
+def assign_ids(organizations: List[Dict[str, str]], registry: Dict) -> List[int]:
+    """ID per organization, in row order; organizations seen before keep theirs, new ones get fresh IDs.
+
+    IDs of organizations that left the CSV are never handed out again.
+    Identical rows are told apart by their occurrence number.
+    """
+    occurrences = Counter()
+    ids = []
+    for org in organizations:
+        key = identity_key(org)
+        occurrences[key] += 1
+        if occurrences[key] > 1:
+            key = f"{key}#{occurrences[key]}"
+        if key not in registry['ids']:
+            registry['ids'][key] = registry['next_id']
+            registry['next_id'] += 1
+        ids.append(registry['ids'][key])
+    return ids
+
+def facet_index(organizations: List[Dict[str, str]], ids: List[int]) -> Dict:
+    """{facet: {value: {'count', 'ids'}}} plus state x type counts"""
+    postings = {facet: defaultdict(list) for facet in FACETS}
+    pair_counts = defaultdict(Counter)
+    for org, org_id in zip(organizations, ids):
+        for facet in FACETS:
+            postings[facet][org[facet]].append(org_id)
+        pair_counts[org['state']][org['type']] += 1
+    facets = {
+        facet: {value: {'count': len(values), 'ids': sorted(values)} for value, values in sorted(by_value.items())}
+        for facet, by_value in postings.items()
+    }
+    return {
+        'facets': facets,
+        'state_type_counts': {state: dict(sorted(counts.items())) for state, counts in sorted(pair_counts.items())}
+    }
+
+def intersect_sorted(first: List[int], second: List[int]) -> List[int]:
+    """Intersection of two ascending ID lists by a merge walk"""
+    i = j = 0
+    result = []
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def filter_ids(index: Dict, **selected: Optional[str]) -> List[int]:
+    """Sorted IDs matching every selected facet value (e.g. state='CA', type='Rapid Re-Housing')"""
+    lists = [index['facets'][facet].get(value, {'ids': []})['ids'] for facet, value in selected.items() if value]
+    if not lists:
+        return sorted(index['ids'])
+    lists.sort(key=len)
+    result = lists[0]
+    for ids in lists[1:]:
+        result = intersect_sorted(result, ids)
+    return result
+
+def build_facets(csv_paths: Iterable[str], output: str, registry_file: str) -> Dict:
+    """Assign IDs, write the facet index and the updated ID registry; return the index"""
+    organizations = read_organizations(expand_csv_paths(csv_paths))
+    registry = load_id_registry(registry_file)
+    known = len(registry['ids'])
+    ids = assign_ids(organizations, registry)
+    index = {
+        'metadata': {
+            'total_organizations': len(organizations),
+            'new_ids': len(registry['ids']) - known,
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'ids[i] is the stable ID of row i of organizations.json; facet ID lists are ascending'
+        },
+        'ids': ids,
+        **facet_index(organizations, ids)
+    }
+    write_json_atomic(output, index, indent=None)
+    write_json_atomic(registry_file, registry, indent=None)
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the state / housing type facet index.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--output', default='facets.json')
+    parser.add_argument('--registry', default='organization_ids.json',
+                        help='identity -> ID map kept between builds so IDs stay stable')
+    parser.add_argument('--state', help='print how many organizations match this state (and --type)')
+    parser.add_argument('--type', help='print how many organizations match this housing type (and --state)')
+    args = parser.parse_args()
+
+    print("=== Building facet index ===")
+    start = time.perf_counter()
+    index = build_facets(args.csv, args.output, args.registry)
+    metadata = index['metadata']
+    print(f"Indexed {metadata['total_organizations']} organizations ({metadata['new_ids']} new IDs) "
+          f"into {args.output} in {time.perf_counter() - start:.2f}s")
+    for facet in FACETS:
+        print(f"   {facet}: {len(index['facets'][facet])} values")
+    if args.state or args.type:
+        matches = filter_ids(index, state=args.state, type=args.type)
+        print(f"🔎 {len(matches)} organizations match state={args.state or '*'} type={args.type or '*'}")
+
+if __name__ == "__main__":
+    main()
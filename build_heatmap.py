@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Build stage: pre-binned heatmap aggregates, one file per zoom level.
+Geocoded organizations are counted into Web Mercator grid cells of a fixed
+on-screen size, split by state and housing type, so the heat layer draws a
+few hundred weighted cells instead of thousands of raw points.
+"""
+
+import argparse
+import math
+import os
+import re
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from build_organizations import load_organizations
+from checkpoint import write_json_atomic
+
+TILE_PIXELS = 256
+MAX_MERCATOR_LAT = 85.05112878
+ZOOM_FILE_PATTERN = re.compile(r'z(\d+)\.json')
+
+def mercator_pixels(lats: np.ndarray, lons: np.ndarray, zoom: int) -> tuple:
+    """Global pixel coordinates at a zoom level, as Leaflet computes them"""
+    scale = TILE_PIXELS * 2 ** zoom
+    phi = np.radians(np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (lons + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / math.pi) / 2.0 * scale
+    return x, y
+
+def aggregate_zoom(lats: np.ndarray, lons: np.ndarray, states: np.ndarray, types: np.ndarray,
+                   zoom: int, cell_pixels: int) -> List[list]:
+    """[lat, lon, state index, type index, count] per non-empty cell; lat/lon is the members' mean"""
+    x, y = mercator_pixels(lats, lons, zoom)
+    cell_x = (x // cell_pixels).astype(np.int64)
+    cell_y = (y // cell_pixels).astype(np.int64)
+    keys = np.stack([cell_x, cell_y, states, types], axis=1)
+    unique, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    mean_lats = np.bincount(inverse, weights=lats) / counts
+    mean_lons = np.bincount(inverse, weights=lons) / counts
+    return [[round(lat, 4), round(lon, 4), state, housing_type, count]
+            for lat, lon, state, housing_type, count in zip(mean_lats.tolist(), mean_lons.tolist(),
+                                                             unique[:, 2].tolist(), unique[:, 3].tolist(),
+                                                             counts.tolist())]
+
+def build_heatmap(organizations: List[Dict], output_dir: str, zooms: List[int], cell_pixels: int) -> Dict[int, int]:
+    """Write z<zoom>.json per zoom level and a manifest; return cells per zoom"""
+    os.makedirs(output_dir, exist_ok=True)
+    geocoded = [org for org in organizations if org['latitude'] is not None]
+    state_names = sorted({org['state'] for org in geocoded})
+    type_names = sorted({org['type'] for org in geocoded})
+    state_codes = {name: i for i, name in enumerate(state_names)}
+    type_codes = {name: i for i, name in enumerate(type_names)}
+    lats = np.array([org['latitude'] for org in geocoded], dtype=np.float64)
+    lons = np.array([org['longitude'] for org in geocoded], dtype=np.float64)
+    states = np.array([state_codes[org['state']] for org in geocoded], dtype=np.int64)
+    types = np.array([type_codes[org['type']] for org in geocoded], dtype=np.int64)
+
+    manifest_zooms = {}
+    for zoom in zooms:
+        cells = aggregate_zoom(lats, lons, states, types, zoom, cell_pixels) if geocoded else []
+        file_name = f"z{zoom}.json"
+        write_json_atomic(os.path.join(output_dir, file_name), {'zoom': zoom, 'cells': cells}, indent=None)
+        manifest_zooms[str(zoom)] = {
+            'file': file_name,
+            'cells': len(cells),
+            'max_count': max((cell[4] for cell in cells), default=0)
+        }
+
+    # Files for zoom levels no longer built; nothing else in output_dir is touched
+    for file_name in os.listdir(output_dir):
+        match = ZOOM_FILE_PATTERN.fullmatch(file_name)
+        if match and match.group(1) not in manifest_zooms:
+            os.remove(os.path.join(output_dir, file_name))
+
+    manifest = {
+        'metadata': {
+            'total_organizations': len(geocoded),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Per-zoom heatmap cells; sum "count" over the selected states/types for the intensity'
+        },
+        'cell_pixels': cell_pixels,
+        'fields': ['latitude', 'longitude', 'state', 'type', 'count'],
+        'states': state_names,
+        'types': type_names,
+        'zooms': manifest_zooms
+    }
+    write_json_atomic(os.path.join(output_dir, 'manifest.json'), manifest, indent=None)
+    return {zoom: manifest_zooms[str(zoom)]['cells'] for zoom in zooms}
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-bin geocoded organizations into per-zoom heatmap cells.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--city-json', default='city_coordinates.json')
+    parser.add_argument('--inferred-json', help='also place organizations by infer_coordinates.py estimates')
+    parser.add_argument('--address-json', help='also place organizations by update_coordinates.py --addresses results')
+    parser.add_argument('--output-dir', default='heatmap')
+    parser.add_argument('--min-zoom', type=int, default=3)
+    parser.add_argument('--max-zoom', type=int, default=12)
+    parser.add_argument('--cell-pixels', type=int, default=32, help='on-screen cell size in pixels at every zoom')
+    args = parser.parse_args()
+
+    print("=== Building heatmap aggregates ===")
+    start = time.perf_counter()
+    organizations = load_organizations(args.csv, args.zip_json, args.city_json, args.inferred_json,
+                                       args.address_json)
+    zooms = list(range(args.min_zoom, args.max_zoom + 1))
+    cells = build_heatmap(organizations, args.output_dir, zooms, args.cell_pixels)
+    geocoded = sum(1 for org in organizations if org['latitude'] is not None)
+    print(f"Binned {geocoded} geocoded organizations in {time.perf_counter() - start:.2f}s")
+    for zoom in zooms:
+        size = os.path.getsize(os.path.join(args.output_dir, f"z{zoom}.json"))
+        print(f"   zoom {zoom:>2}: {cells[zoom]:>6} cells, {size / 1024:7.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Build stage: pre-joined organizations dataset.
+Normalizes CSV rows the way script.js does and attaches coordinates
+(street address first, then zip, then "City, ST", then inferred zip
+estimates), so clients fetch one file with nothing to join.
+"""
+
+import argparse
+import csv
+import json
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from checkpoint import write_json_atomic
+from csv_ingest import (STATE_COLUMNS, ZIP_COLUMNS, expand_csv_paths, first_value, normalize_address, normalize_zip,
+                        open_csv_text)
+
+FIELDS = ['name', 'type', 'zip', 'city', 'state', 'phone', 'email', 'address',
+          'latitude', 'longitude', 'coordinateSource', 'coordinateConfidence']
+
+def normalize_organization(record: Dict[str, str]) -> Dict[str, str]:
+    """Map a raw CSV record onto the fields script.js uses (same column fallbacks)"""
+    raw_zip = first_value(record, ZIP_COLUMNS)
+    return {
+        'name': first_value(record, ('name', 'organization', 'org name')) or 'Unknown',
+        'type': first_value(record, ('housing_type', 'type', 'category', 'org type')) or 'Unknown',
+        'zip': normalize_zip(raw_zip) or raw_zip,
+        'city': record.get('city') or 'Unknown',
+        'state': first_value(record, STATE_COLUMNS) or 'Unknown',
+        'phone': record.get('phone') or '',
+        'email': record.get('email') or '',
+        'address': record.get('address') or ''
+    }
+
+def read_organizations(csv_paths: Iterable[str]) -> List[Dict[str, str]]:
+    """Read and normalize every organization, in CSV order"""
+    organizations = []
+    for path in csv_paths:
+        with open_csv_text(path) as file:
+            reader = csv.reader(file)
+            header = [name.strip().lower() for name in next(reader, [])]
+            for row in reader:
+                if not any(value.strip() for value in row):
+                    continue
+                record = {key: value.strip() for key, value in zip(header, row)}
+                organizations.append(normalize_organization(record))
+    return organizations
+
+def load_city_coordinates(json_file: str) -> Dict[str, Dict[str, float]]:
+    """Load "City, ST" coordinates; the file is optional"""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as file:
+            return json.load(file).get('city_coordinates', {})
+    except FileNotFoundError:
+        print(f"City coordinates file {json_file} not found - only zip coordinates will be used")
+        return {}
+
+def load_inferred_coordinates(json_file: str) -> Dict[str, Dict]:
+    """Load estimates from infer_coordinates.py"""
+    with open(json_file, 'r', encoding='utf-8') as file:
+        return json.load(file).get('coordinates', {})
+
+def load_address_coordinates(json_file: str) -> Dict[str, Dict[str, float]]:
+    """Load normalized address -> coordinates from update_coordinates.py --addresses"""
+    with open(json_file, 'r', encoding='utf-8') as file:
+        addresses = json.load(file).get('addresses', {})
+    return {key: {'latitude': lat, 'longitude': lon} for key, (lat, lon) in addresses.items()}
+
+def attach_coordinates(organizations: List[Dict], zip_coords: Dict[str, Dict[str, float]],
+                       city_coords: Dict[str, Dict[str, float]],
+                       inferred_coords: Optional[Dict[str, Dict]] = None,
+                       address_coords: Optional[Dict[str, Dict[str, float]]] = None) -> Counter:
+    """Add latitude, longitude, coordinateSource and coordinateConfidence in place; return counts per source
+
+    coordinateConfidence is the estimate's confidence for inferred rows and
+    None for every other source.
+    """
+    sources = Counter()
+    for org in organizations:
+        coords = None
+        source = 'address'
+        if address_coords and org['address']:
+            # 'Unknown' is normalize_organization's placeholder, not a city name
+            city = '' if org['city'] == 'Unknown' else org['city']
+            key = normalize_address(org['address'], city, org['state'], org['zip'])
+            coords = address_coords.get(key) if key else None
+        if coords is None:
+            coords = zip_coords.get(org['zip']) if org['zip'] else None
+            source = 'zip'
+        if coords is None:
+            coords = city_coords.get(f"{org['city']}, {org['state']}")
+            source = 'city'
+        if coords is None and inferred_coords and org['zip']:
+            coords = inferred_coords.get(org['zip'])
+            source = 'inferred'
+        if coords is None:
+            org['latitude'], org['longitude'], org['coordinateSource'] = None, None, 'none'
+        else:
+            org['latitude'], org['longitude'], org['coordinateSource'] = coords['latitude'], coords['longitude'], source
+        org['coordinateConfidence'] = coords.get('confidence') if source == 'inferred' and coords else None
+        sources[org['coordinateSource']] += 1
+    return sources
+
+def load_organizations(csv_paths: Iterable[str], zip_json: str = 'zip_coordinates.json',
+                       city_json: Optional[str] = 'city_coordinates.json',
+                       inferred_json: Optional[str] = None, address_json: Optional[str] = None) -> List[Dict]:
+    """Normalized organizations with coordinates attached.
+
+    Inferred and address coordinates are only used when their files are given.
+    """
+    with open(zip_json, 'r', encoding='utf-8') as file:
+        zip_coords = json.load(file).get('coordinates', {})
+    city_coords = load_city_coordinates(city_json) if city_json else {}
+    inferred_coords = load_inferred_coordinates(inferred_json) if inferred_json else {}
+    address_coords = load_address_coordinates(address_json) if address_json else {}
+    organizations = read_organizations(expand_csv_paths(csv_paths))
+    attach_coordinates(organizations, zip_coords, city_coords, inferred_coords, address_coords)
+    return organizations
+
+def organization_rows(organizations: List[Dict]) -> List[list]:
+    """Organizations as positional rows in FIELDS order, coordinates rounded to ~10 cm"""
+    rows = []
+    for org in organizations:
+        row = [org[field] for field in FIELDS]
+        if org['latitude'] is not None:
+            row[FIELDS.index('latitude')] = round(org['latitude'], 6)
+            row[FIELDS.index('longitude')] = round(org['longitude'], 6)
+        rows.append(row)
+    return rows
+
+def build_organizations(csv_paths: Iterable[str], zip_json: str, city_json: Optional[str], output: str,
+                        inferred_json: Optional[str] = None, address_json: Optional[str] = None) -> Counter:
+    """Write the pre-joined organizations artifact and return counts per coordinate source"""
+    organizations = load_organizations(csv_paths, zip_json, city_json, inferred_json, address_json)
+    sources = Counter(org['coordinateSource'] for org in organizations)
+    result = {
+        'metadata': {
+            'total_organizations': len(organizations),
+            'by_address': sources['address'],
+            'by_zip': sources['zip'],
+            'by_city': sources['city'],
+            'by_inferred': sources['inferred'],
+            'no_coordinates': sources['none'],
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Organizations with normalized fields and coordinates; rows follow "fields"'
+        },
+        'fields': FIELDS,
+        'organizations': organization_rows(organizations)
+    }
+    write_json_atomic(output, result, indent=None)
+    return sources
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-join organizations with their coordinates.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--city-json', default='city_coordinates.json')
+    parser.add_argument('--inferred-json',
+                        help='zip estimates from infer_coordinates.py, used last (e.g. inferred_coordinates.json)')
+    parser.add_argument('--address-json',
+                        help='street address coordinates from update_coordinates.py --addresses, used first '
+                             '(e.g. address_coordinates.json)')
+    parser.add_argument('--output', default='organizations.json')
+    args = parser.parse_args()
+
+    print("=== Building organizations dataset ===")
+    start = time.perf_counter()
+    sources = build_organizations(args.csv, args.zip_json, args.city_json, args.output, args.inferred_json,
+                                  args.address_json)
+    total = sum(sources.values())
+    print(f"Wrote {total} organizations to {args.output} in {time.perf_counter() - start:.2f}s")
+    print(f"🏠 Resolved by street address: {sources['address']}")
+    print(f"📍 Resolved by zip: {sources['zip']}")
+    print(f"🏙️  Resolved by city: {sources['city']}")
+    print(f"🧭 Inferred from nearby zips: {sources['inferred']}")
+    print(f"❌ No coordinates: {sources['none']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Build stage: tile-sharded spatial index for lazy proximity search.
+Buckets geocoded organizations into fixed-degree tiles, one shard file per
+tile plus a manifest, so a radius search only loads tiles touching its circle.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from build_organizations import FIELDS, load_organizations, organization_rows
+from checkpoint import write_json_atomic
+
+EARTH_RADIUS_MILES = 3959  # same as calculateDistance in script.js
+MILES_PER_DEGREE_LAT = 69.0
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def tile_key(lat: float, lon: float, tile_size: float) -> str:
+    return f"{math.floor(lat / tile_size)}_{math.floor(lon / tile_size)}"
+
+def tile_bounds(key: str, tile_size: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile"""
+    lat_index, lon_index = (int(part) for part in key.split('_'))
+    return (lat_index * tile_size, lon_index * tile_size, (lat_index + 1) * tile_size, (lon_index + 1) * tile_size)
+
+def tiles_for_radius(tile_keys: List[str], lat: float, lon: float, radius_miles: float,
+                     tile_size: float) -> List[str]:
+    """Tiles whose rectangle comes within radius_miles of the point"""
+    selected = []
+    for key in tile_keys:
+        south, west, north, east = tile_bounds(key, tile_size)
+        nearest_lat = min(max(lat, south), north)
+        nearest_lon = min(max(lon, west), east)
+        if haversine_miles(lat, lon, nearest_lat, nearest_lon) <= radius_miles:
+            selected.append(key)
+    return selected
+
+def build_spatial_index(organizations: List[Dict], output_dir: str, tile_size: float) -> Dict[str, int]:
+    """Write one shard per non-empty tile and a manifest; return counts per tile"""
+    os.makedirs(output_dir, exist_ok=True)
+    geocoded = [org for org in organizations if org['latitude'] is not None]
+    rows = organization_rows(geocoded)
+    tiles = defaultdict(list)
+    for org, row in zip(geocoded, rows):
+        tiles[tile_key(org['latitude'], org['longitude'], tile_size)].append(row)
+
+    manifest_tiles = {}
+    for key, tile_rows in sorted(tiles.items()):
+        file_name = f"tile_{key}.json"
+        write_json_atomic(os.path.join(output_dir, file_name), tile_rows, indent=None)
+        manifest_tiles[key] = {
+            'file': file_name,
+            'count': len(tile_rows),
+            'bounds': tile_bounds(key, tile_size)
+        }
+
+    # Shards from a previous build that no longer have organizations
+    for path in glob.glob(os.path.join(output_dir, 'tile_*.json')):
+        if os.path.basename(path)[len('tile_'):-len('.json')] not in manifest_tiles:
+            os.remove(path)
+
+    manifest = {
+        'metadata': {
+            'total_organizations': len(geocoded),
+            'total_tiles': len(manifest_tiles),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'tile_size_degrees': tile_size,
+        'fields': FIELDS,
+        'tiles': manifest_tiles
+    }
+    write_json_atomic(os.path.join(output_dir, 'manifest.json'), manifest, indent=None)
+    return {key: len(tile_rows) for key, tile_rows in tiles.items()}
+
+def search_spatial_index(index_dir: str, lat: float, lon: float, radius_miles: float,
+                         housing_type: str = '') -> List[Dict]:
+    """Reference radius search: load only intersecting tiles, sorted by distance"""
+    with open(os.path.join(index_dir, 'manifest.json'), 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    fields = manifest['fields']
+    results = []
+    for key in tiles_for_radius(list(manifest['tiles']), lat, lon, radius_miles, manifest['tile_size_degrees']):
+        with open(os.path.join(index_dir, manifest['tiles'][key]['file']), 'r', encoding='utf-8') as file:
+            for row in json.load(file):
+                org = dict(zip(fields, row))
+                if housing_type and org['type'] != housing_type:
+                    continue
+                distance = haversine_miles(lat, lon, org['latitude'], org['longitude'])
+                if distance <= radius_miles:
+                    org['distance'] = round(distance, 1)
+                    results.append(org)
+    results.sort(key=lambda org: org['distance'])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Shard geocoded organizations into spatial tiles.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--city-json', default='city_coordinates.json')
+    parser.add_argument('--inferred-json', help='also place organizations by infer_coordinates.py estimates')
+    parser.add_argument('--address-json', help='also place organizations by update_coordinates.py --addresses results')
+    parser.add_argument('--output-dir', default='tiles')
+    parser.add_argument('--tile-size', type=float, default=1.0, help='tile edge in degrees')
+    args = parser.parse_args()
+
+    print("=== Building spatial index ===")
+    organizations = load_organizations(args.csv, args.zip_json, args.city_json, args.inferred_json,
+                                       args.address_json)
+    counts = build_spatial_index(organizations, args.output_dir, args.tile_size)
+    if not counts:
+        print("No geocoded organizations to index.")
+        return
+
+    shard_bytes = [os.path.getsize(os.path.join(args.output_dir, f"tile_{key}.json")) for key in counts]
+    print(f"Wrote {len(counts)} tiles of {args.tile_size}° to {args.output_dir}/")
+    print(f"📦 Organizations per tile: avg {sum(counts.values()) / len(counts):.1f}, max {max(counts.values())}")
+    print(f"📦 Shard size: avg {sum(shard_bytes) / len(shard_bytes) / 1024:.1f} KB, "
+          f"max {max(shard_bytes) / 1024:.1f} KB, total {sum(shard_bytes) / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Build step: precomputed ZIP-to-ZIP neighbor table.
+For every zip in zip_coordinates.json, the other zips with organizations
+within a maximum radius, nearest first, so a radius search or an expanding
+search from a zip is a prefix slice of one list instead of a haversine scan.
+A zip is never in its own list; add its own organizations separately.
+
+Layout (little-endian):
+    header      24 bytes: magic b'ZNBR', uint16 version, uint16 reserved,
+                          uint32 zip count, uint32 zips with organizations,
+                          uint32 neighbor pairs, float32 miles per distance step
+    zips        uint32[zip count], ascending
+    offsets     uint32[zip count + 1]; zip i's neighbors are pairs offsets[i]..offsets[i+1]
+    targets     uint32[zips with organizations], ascending
+    org counts  uint32[zips with organizations]
+    neighbors   uint16[pairs], indices into targets
+    distances   uint8[pairs], miles / step rounded, nondecreasing within a zip
+
+A step is radius / 255, so distances are within half a step (0.1 mi at the
+default 50 mi radius) of the haversine value.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+from checkpoint import write_bytes_atomic
+from csv_ingest import expand_csv_paths, iter_column_values, normalize_zip
+from proximity import ProximityIndex, haversine_miles_np, load_zip_points
+
+MAX_RADIUS_MILES = 50.0  # expandSearch in script.js stops doubling here
+MAGIC = b'ZNBR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIf')
+DISTANCE_STEPS = 255  # uint8 distances
+
+def organization_zip_counts(csv_paths: List[str]) -> Counter:
+    """Organizations per normalized zip code"""
+    counts = Counter()
+    for path in csv_paths:
+        counts.update(zip_code for zip_code in map(normalize_zip, iter_column_values(path, 'zip')) if zip_code)
+    return counts
+
+def zip_neighbors(source_lats: np.ndarray, source_lons: np.ndarray, target_lats: np.ndarray,
+                  target_lons: np.ndarray, radius_miles: float, cell_size: float = 1.0) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(target indices, miles) within radius of each source, nearest first.
+
+    Sources are grouped by grid cell so each group shares one candidate set
+    and one (sources x candidates) distance matrix, as in ProximityIndex.coverage.
+    """
+    index = ProximityIndex(target_lats, target_lons, np.zeros(len(target_lats), dtype=np.int64), [''], cell_size)
+    result = [(np.empty(0, dtype=np.int64), np.empty(0))] * len(source_lats)
+    lat_cells = np.floor(source_lats / cell_size).astype(np.int64)
+    lon_cells = np.floor(source_lons / cell_size).astype(np.int64)
+    cell_keys, groups = np.unique(np.stack([lat_cells, lon_cells], axis=1), axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+    for g, (lat_cell, lon_cell) in enumerate(cell_keys.tolist()):
+        members = np.flatnonzero(groups == g)
+        candidates = index.candidates(lat_cell * cell_size, lon_cell * cell_size,
+                                      (lat_cell + 1) * cell_size, (lon_cell + 1) * cell_size, radius_miles)
+        if len(candidates) == 0:
+            continue
+        distances = haversine_miles_np(source_lats[members, None], source_lons[members, None],
+                                       target_lats[None, candidates], target_lons[None, candidates])
+        for row, member in enumerate(members.tolist()):
+            keep = np.flatnonzero(distances[row] <= radius_miles)
+            order = keep[np.argsort(distances[row, keep], kind='stable')]
+            result[member] = (candidates[order], distances[row, order])
+    return result
+
+def encode_zip_neighbors(zip_codes: List[str], targets: List[str], organization_counts: List[int],
+                         found: List[Tuple[np.ndarray, np.ndarray]], radius_miles: float) -> bytes:
+    """Pack zip_neighbors results (indices into targets) into the binary layout, dropping each zip itself"""
+    if len(targets) > np.iinfo(np.uint16).max + 1:
+        raise ValueError(f"{len(targets)} zips with organizations don't fit 16-bit neighbor indices")
+    step = radius_miles / DISTANCE_STEPS
+    target_ints = np.array([int(zip_code) for zip_code in targets], dtype=np.int64)
+    neighbor_lists, distance_lists = [], []
+    offsets = np.zeros(len(zip_codes) + 1, dtype='<u4')
+    for i, (zip_code, (indices, miles)) in enumerate(zip(zip_codes, found)):
+        keep = target_ints[indices] != int(zip_code)
+        neighbor_lists.append(indices[keep])
+        distance_lists.append(miles[keep])
+        offsets[i + 1] = offsets[i] + np.count_nonzero(keep)
+    neighbors = np.concatenate(neighbor_lists) if neighbor_lists else np.empty(0, dtype=np.int64)
+    miles = np.concatenate(distance_lists) if distance_lists else np.empty(0)
+    distances = np.minimum(np.round(miles / step), DISTANCE_STEPS)
+    header = HEADER.pack(MAGIC, VERSION, 0, len(zip_codes), len(targets), len(neighbors), step)
+    return b''.join([
+        header,
+        np.array([int(zip_code) for zip_code in zip_codes], dtype='<u4').tobytes(),
+        offsets.tobytes(),
+        target_ints.astype('<u4').tobytes(),
+        np.array(organization_counts, dtype='<u4').tobytes(),
+        neighbors.astype('<u2').tobytes(),
+        distances.astype('u1').tobytes()
+    ])
+
+def build_zip_neighbors(zip_json: str, csv_paths: List[str], output: str,
+                        radius_miles: float = MAX_RADIUS_MILES) -> Tuple[int, int, int]:
+    """Write the neighbor table; return (zips, zips with organizations, neighbor pairs)"""
+    zip_codes, lats, lons = load_zip_points(zip_json)
+    counts = organization_zip_counts(csv_paths)
+    positions = {zip_code: i for i, zip_code in enumerate(zip_codes)}
+    targets = sorted(zip_code for zip_code in counts if zip_code in positions)
+    target_rows = np.array([positions[zip_code] for zip_code in targets], dtype=np.int64)
+
+    found = zip_neighbors(lats, lons, lats[target_rows], lons[target_rows], radius_miles)
+    data = encode_zip_neighbors(zip_codes, targets, [counts[zip_code] for zip_code in targets], found, radius_miles)
+    write_bytes_atomic(output, data)
+    return len(zip_codes), len(targets), HEADER.unpack_from(data)[5]
+
+class ZipNeighbors:
+    """Memory-mapped neighbor table"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.target_count, self.pair_count, self.step = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: not a version {VERSION} zip neighbor table")
+        sizes = [('<u4', self.count), ('<u4', self.count + 1), ('<u4', self.target_count),
+                 ('<u4', self.target_count), ('<u2', self.pair_count), ('u1', self.pair_count)]
+        if len(self.mm) != HEADER.size + sum(np.dtype(dtype).itemsize * count for dtype, count in sizes):
+            self.mm.close()
+            raise ValueError(f"{path}: truncated zip neighbor table")
+        arrays, offset = [], HEADER.size
+        for dtype, count in sizes:
+            arrays.append(np.frombuffer(self.mm, dtype=dtype, count=count, offset=offset))
+            offset += np.dtype(dtype).itemsize * count
+        self.zips, self.offsets, self.targets, self.organization_counts, self.neighbors, self.distances = arrays
+
+    def within(self, zip_code: str, radius_miles: float) -> List[Tuple[str, float]]:
+        """(zip, miles) of the other zips with organizations within radius of zip_code, nearest first"""
+        if not zip_code.isdigit():
+            return []
+        i = int(np.searchsorted(self.zips, int(zip_code)))
+        if i == self.count or self.zips[i] != int(zip_code):
+            return []
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        distances = self.distances[start:end]
+        end = start + int(np.searchsorted(distances, round(radius_miles / self.step), side='right'))
+        return [(f"{int(self.targets[target]):05d}", round(float(steps) * self.step, 1))
+                for target, steps in zip(self.neighbors[start:end], self.distances[start:end])]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        # numpy views export the mmap buffer; drop them before closing it
+        del self.zips, self.offsets, self.targets, self.organization_counts, self.neighbors, self.distances
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute the zips with organizations near every zip code.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--output', default='zip_neighbors.bin')
+    parser.add_argument('--radius', type=float, default=MAX_RADIUS_MILES, help='largest radius a query can ask for')
+    parser.add_argument('--zip', help='print the neighbors of this zip code from the table in --output (no rebuild)')
+    args = parser.parse_args()
+
+    if args.zip:
+        with ZipNeighbors(args.output) as table:
+            for zip_code, miles in table.within(args.zip, args.radius):
+                print(f"   {zip_code} {miles:6.1f} mi")
+        return
+
+    print("=== Building zip neighbor table ===")
+    start = time.perf_counter()
+    total, with_organizations, pairs = build_zip_neighbors(args.zip_json, expand_csv_paths(args.csv), args.output,
+                                                           args.radius)
+    print(f"{total} zips, {with_organizations} with organizations, "
+          f"{pairs} pairs within {args.radius:g} mi in {time.perf_counter() - start:.2f}s")
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Crash-safe persistence helpers.
+Atomic file replacement, an append-only journal of geocoding results, and
+content fingerprints for skipping runs whose files have not changed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+HASH_CHUNK_BYTES = 1 << 20
+
+def write_bytes_atomic(path: str, data: bytes):
+    """Write data to a temp file next to path, fsync it and rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        # mkstemp creates 0600 files; keep the target's mode (or the umask default)
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = 2):
+    """Serialize data as JSON and atomically replace path with it"""
+    separators = None if indent is not None else (',', ':')
+    text = json.dumps(data, indent=indent, ensure_ascii=False, separators=separators)
+    write_bytes_atomic(path, text.encode('utf-8'))
+
+def ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b'\n'
+
+class CoordinateJournal:
+    """Append-only JSON-lines log of results, written as they arrive"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        if self.file.tell() and not ends_with_newline(path):
+            # Finish a line torn by a crash so the next entry starts on its own line
+            self.file.write('\n')
+
+    def append(self, key: str, entry: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+               transient: bool = False):
+        """Record a coordinate entry (e.g. {'latitude': ..., 'longitude': ...}) or a failure"""
+        if entry is not None:
+            entry = {'key': key, **entry}
+        else:
+            entry = {'key': key, 'error': error or 'failed'}
+            if transient:
+                entry['transient'] = True
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def sync(self):
+        """Force journaled lines to disk"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def replay_journal(path: str) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """Read a journal back into (coordinates, failed keys), skipping lines torn by a crash.
+
+    Transient failures are left out so a resumed run tries them again.
+    """
+    coordinates = {}
+    failed = set()
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = entry.pop('key')
+                if 'latitude' in entry:
+                    coordinates[key] = entry
+                    failed.discard(key)
+                elif not entry.get('transient'):
+                    failed.add(key)
+    except FileNotFoundError:
+        pass
+    return coordinates, failed
+
+def file_fingerprint(path: str, previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Size, mtime and sha256 of a file (None if missing); previous's hash is reused when size and mtime match"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+class InputFingerprints:
+    """Fingerprints of the files a run read and wrote, kept next to its output"""
+
+    def __init__(self, path: str, files: List[str], settings: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.files = files
+        self.settings = settings or {}
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self.recorded = json.load(file)
+        except (OSError, ValueError):
+            self.recorded = {}
+
+    def current(self) -> Dict[str, Any]:
+        recorded = self.recorded.get('files', {})
+        return {path: file_fingerprint(path, recorded.get(path)) for path in self.files}
+
+    def unchanged(self) -> bool:
+        """Whether every file has the content (and the run the settings) recorded last time.
+
+        Only files whose size or mtime moved are hashed again, so an unchanged
+        tree costs a stat per file.
+        """
+        if not self.recorded or self.recorded.get('settings') != self.settings:
+            return False
+        current = self.current()
+        if set(current) != set(self.recorded['files']) or None in current.values():
+            return False
+        if any(current[path]['sha256'] != self.recorded['files'][path]['sha256'] for path in current):
+            return False
+        if current != self.recorded['files']:
+            # Touched but identical; remember the new mtimes so the next check is stat-only again
+            self.record(current)
+        return True
+
+    def record(self, current: Optional[Dict[str, Any]] = None):
+        self.recorded = {'settings': self.settings, 'files': current or self.current()}
+        write_json_atomic(self.path, self.recorded)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compact binary zip coordinate artifact and a memory-mapped loader.
+
+Layout (little-endian):
+    header   16 bytes: magic b'ZCRD', uint16 version, uint16 reserved,
+                       uint32 zip count, uint32 failed zip count
+    zips     uint32[count], sorted ascending
+    lats     float32[count]
+    lons     float32[count]
+
+The arrays are 4-byte aligned, so a browser can read them straight out of
+an ArrayBuffer with Uint32Array/Float32Array views.
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from checkpoint import write_bytes_atomic
+
+MAGIC = b'ZCRD'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+
+def encode_coordinate_binary(coordinates: Dict[str, Dict[str, float]], failed_count: int = 0) -> bytes:
+    """Pack coordinates into the binary layout"""
+    zip_codes = sorted(coordinates, key=int)
+    zips = array('I', (int(zip_code) for zip_code in zip_codes))
+    lats = array('f', (coordinates[zip_code]['latitude'] for zip_code in zip_codes))
+    lons = array('f', (coordinates[zip_code]['longitude'] for zip_code in zip_codes))
+    if sys.byteorder != 'little':
+        for values in (zips, lats, lons):
+            values.byteswap()
+    header = HEADER.pack(MAGIC, VERSION, 0, len(zip_codes), failed_count)
+    return header + zips.tobytes() + lats.tobytes() + lons.tobytes()
+
+def write_coordinate_binary(path: str, coordinates: Dict[str, Dict[str, float]], failed_count: int = 0):
+    """Atomically write the binary artifact"""
+    write_bytes_atomic(path, encode_coordinate_binary(coordinates, failed_count))
+
+class CoordinateIndex:
+    """Memory-mapped binary artifact with binary-search lookups"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.failed_count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: not a version {VERSION} coordinate artifact")
+        if len(self.mm) != HEADER.size + 12 * self.count:
+            self.mm.close()
+            raise ValueError(f"{path}: truncated coordinate artifact")
+
+        offset, size = HEADER.size, 4 * self.count
+        view = memoryview(self.mm)
+        if sys.byteorder == 'little':
+            self.zips = view[offset:offset + size].cast('I')
+            self.lats = view[offset + size:offset + 2 * size].cast('f')
+            self.lons = view[offset + 2 * size:offset + 3 * size].cast('f')
+        else:
+            # Big-endian hosts pay for one copy instead of a zero-copy view
+            self.zips, self.lats, self.lons = array('I'), array('f'), array('f')
+            for values, start in ((self.zips, offset), (self.lats, offset + size), (self.lons, offset + 2 * size)):
+                values.frombytes(view[start:start + size])
+                values.byteswap()
+        view.release()
+
+    def lookup(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a zip code, or None"""
+        if not zip_code.isdigit():
+            return None
+        key = int(zip_code)
+        i = bisect_left(self.zips, key)
+        if i < self.count and self.zips[i] == key:
+            return (self.lats[i], self.lons[i])
+        return None
+
+    def __contains__(self, zip_code: str) -> bool:
+        return self.lookup(zip_code) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        for values in (self.zips, self.lats, self.lons):
+            if isinstance(values, memoryview):
+                values.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the binary zip coordinate artifact.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='convert a coordinates JSON file')
+    build.add_argument('json_file', nargs='?', default='zip_coordinates.json')
+    build.add_argument('-o', '--output', default='zip_coordinates.bin')
+    lookup = subparsers.add_parser('lookup', help='look zip codes up in an artifact')
+    lookup.add_argument('zip_codes', nargs='+')
+    lookup.add_argument('--file', default='zip_coordinates.bin')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with open(args.json_file, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        write_coordinate_binary(args.output, data.get('coordinates', {}), len(data.get('failed_zips', [])))
+        print(f"Wrote {len(data.get('coordinates', {}))} coordinates to {args.output}")
+    else:
+        with CoordinateIndex(args.file) as index:
+            for zip_code in args.zip_codes:
+                coords = index.lookup(zip_code)
+                print(f"{zip_code}: {'not found' if coords is None else f'({coords[0]:.5f}, {coords[1]:.5f})'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Streaming readers for the organizations CSV.
+Handles plain, gzip and bz2 files, several files and glob patterns.
+"""
+
+import bz2
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import json
+import operator
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from checkpoint import write_json_atomic
+
+ZIP_PATTERN = re.compile(r'(\d{4,5})(?:-\d{4})?|(\d{5})\d{4}')
+# Alternative column names, in the order build_organizations and script.js try them
+STATE_COLUMNS = ('state', 'state code')
+ZIP_COLUMNS = ('zip', 'zip code', 'zipcode')
+ADDRESS_COLUMNS = ('address', 'city') + STATE_COLUMNS + ZIP_COLUMNS
+CITY_COLUMNS = ('city',) + STATE_COLUMNS + ZIP_COLUMNS
+# USPS-style abbreviations, so "123 North Main Street" and "123 N. Main St" are one lookup
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy', 'circle': 'cir',
+    'terrace': 'ter', 'square': 'sq', 'trail': 'trl', 'expressway': 'expy', 'freeway': 'fwy',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'first': '1st', 'second': '2nd', 'third': '3rd', 'fourth': '4th', 'fifth': '5th'
+}
+STREET_SUFFIXES = {'st', 'ave', 'rd', 'dr', 'blvd', 'ln', 'ct', 'pl', 'pkwy', 'hwy', 'cir', 'ter', 'sq', 'trl',
+                   'expy', 'fwy', 'way', 'loop', 'pike', 'row', 'aly', 'plz'}
+# Suite, unit, floor, ...; with their number they don't move the building
+ADDRESS_UNITS = {'suite', 'ste', 'apartment', 'apt', 'unit', 'floor', 'fl', 'room', 'rm', 'building', 'bldg',
+                 'dept', '#'}
+ADDRESS_WORD_PATTERN = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*|#')
+HOUSE_NUMBER_PATTERN = re.compile(r'\d+[a-z]?(?:-\d+[a-z]?)?')
+PO_BOX_PATTERN = re.compile(r'\bp\s*o\s*box\b|\bpost office box\b')
+FINGERPRINT_BYTES = 64 * 1024
+TAIL_CHUNK_BYTES = 1 << 20
+
+def normalize_zip(value: str) -> Optional[str]:
+    """Return the 5-digit zip code for a raw value, or None if it is not one.
+
+    Accepts ZIP+4 ("12345-6789", "123456789") and 4-digit values that lost
+    their leading zero in a spreadsheet ("2134" -> "02134").
+    """
+    match = ZIP_PATTERN.fullmatch(value.strip())
+    if not match:
+        return None
+    return (match.group(1) or match.group(2)).zfill(5)
+
+def first_value(record: Dict[str, str], keys: Iterable[str]) -> str:
+    """First non-empty value among alternative column names"""
+    for key in keys:
+        value = record.get(key)
+        if value:
+            return value
+    return ''
+
+def is_unit_identifier(word: str) -> bool:
+    """Unit numbers like 200, 3b or a, as opposed to street name words like way"""
+    return len(word) == 1 or any(char.isdigit() for char in word)
+
+def drop_units(words: List[str]) -> List[str]:
+    """Words without unit designators and their identifiers after the street suffix"""
+    suffix = next((i for i, word in enumerate(words) if i > 0 and word in STREET_SUFFIXES), None)
+    if suffix is None:
+        return words
+    kept = words[:suffix + 1]
+    i = suffix + 1
+    while i < len(words):
+        if words[i] in ADDRESS_UNITS and i + 1 < len(words) and is_unit_identifier(words[i + 1]):
+            i += 2
+        else:
+            kept.append(words[i])
+            i += 1
+    return kept
+
+def is_locality(words: List[str], city: str, state: str, zip_code: Optional[str]) -> bool:
+    """Whether an address part just repeats the row's city, state and zip"""
+    city_words = city.split()
+    matched = False
+    if city_words and words[:len(city_words)] == city_words:
+        words, matched = words[len(city_words):], True
+    if words[:1] == [state.lower()]:
+        words, matched = words[1:], True
+    if words and normalize_zip(words[0]) is not None and (matched or normalize_zip(words[0]) == zip_code):
+        words, matched = words[1:], True
+    return matched and not words
+
+def normalize_address(address: str, city: str, state: str, zip_value: str = '') -> Optional[str]:
+    """Lookup key for a street address ("123 n main st, springfield, IL 62701"), or None if it can't be one.
+
+    Case, punctuation, whitespace and common spellings are folded, suite or
+    unit numbers dropped and a trailing city/state/zip matching the columns
+    removed, so duplicate addresses collapse to one key. PO boxes and
+    addresses without a house number and street name give None.
+    """
+    street = address.lower().replace('.', '')
+    if PO_BOX_PATTERN.search(street):
+        return None
+    state = state.strip().upper()
+    if len(state) != 2 or not state.isalpha():
+        return None
+    city = ' '.join(city.lower().split())
+    zip_code = normalize_zip(zip_value) if zip_value else None
+
+    parts = [ADDRESS_WORD_PATTERN.findall(part) for part in street.split(',')]
+    parts = [part for part in parts if part]
+    while len(parts) > 1 and is_locality(parts[-1], city, state, zip_code):
+        parts.pop()
+    # "123 Main St, Suite 200": a part that is only a unit
+    parts = [part for i, part in enumerate(parts)
+             if i == 0 or not (len(part) == 2 and part[0] in ADDRESS_UNITS and is_unit_identifier(part[1]))]
+    words = [word for part in parts for word in part]
+    if len(words) < 2 or not HOUSE_NUMBER_PATTERN.fullmatch(words[0]):
+        return None
+    words = drop_units([words[0]] + [ADDRESS_ABBREVIATIONS.get(word, word) for word in words[1:]])
+    words = [word for word in words if word != '#']
+    if len(words) < 2:
+        return None
+    return f"{' '.join(words)}, {city}, {state}{f' {zip_code}' if zip_code else ''}"
+
+def address_key(record: Dict[str, str]) -> Optional[str]:
+    """normalize_address for a record keyed by column name, with the state and zip column fallbacks"""
+    return normalize_address(record.get('address') or '', record.get('city') or '',
+                             first_value(record, STATE_COLUMNS), first_value(record, ZIP_COLUMNS))
+
+def city_row(row: Tuple[str, ...]) -> Tuple[str, str, str]:
+    """(zip, city, state) from a CITY_COLUMNS row, with the state and zip column fallbacks"""
+    record = dict(zip(CITY_COLUMNS, row))
+    return first_value(record, ZIP_COLUMNS), record['city'], first_value(record, STATE_COLUMNS)
+
+def open_csv_text(path: str) -> IO[str]:
+    """Open a CSV file for reading, decompressing .gz and .bz2 transparently"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+def expand_csv_paths(patterns: Union[str, Iterable[str]]) -> List[str]:
+    """Expand glob patterns into a sorted, de-duplicated list of paths"""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns:
+        # Plain paths that don't exist are kept so opening them raises FileNotFoundError
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+def column_index(header: List[str], column: str) -> Optional[int]:
+    """Position of a column in a header row, matched case-insensitively"""
+    names = [name.strip().lower() for name in header]
+    return names.index(column) if column in names else None
+
+def iter_column_values(path: str, column: str) -> Iterator[str]:
+    """Yield one column of a CSV file, resolving its index once from the header"""
+    with open_csv_text(path) as file:
+        reader = csv.reader(file)
+        index = column_index(next(reader, []), column)
+        if index is None:
+            print(f"⚠️  {path}: no '{column}' column")
+            return
+        for row in reader:
+            if len(row) > index:
+                yield row[index]
+
+def extract_zip_codes(paths: Iterable[str], column: str = 'zip') -> Set[str]:
+    """Unique normalized zip codes in the given CSV files.
+
+    Raw values are de-duplicated before normalizing, so memory is bounded by
+    the number of distinct values rather than the number of rows.
+    """
+    raw_values = set()
+    for path in paths:
+        raw_values.update(iter_column_values(path, column))
+    zip_codes = set(map(normalize_zip, raw_values))
+    zip_codes.discard(None)
+    return zip_codes
+
+def iter_new_zip_codes(paths: Iterable[str], seen: Set[str], column: str = 'zip') -> Iterator[str]:
+    """Yield each normalized zip code the first time it appears in the CSV files, adding it to seen"""
+    raw_seen = set()
+    for path in paths:
+        for value in iter_column_values(path, column):
+            if value in raw_seen:
+                continue
+            raw_seen.add(value)
+            zip_code = normalize_zip(value)
+            if zip_code and zip_code not in seen:
+                seen.add(zip_code)
+                yield zip_code
+
+def iter_columns(path: str, columns: Tuple[str, ...]) -> Iterator[Tuple[str, ...]]:
+    """Yield several columns of a CSV file as tuples ('' where a column is missing)"""
+    with open_csv_text(path) as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        indexes = [column_index(header, column) for column in columns]
+        for row in reader:
+            yield tuple(row[i].strip() if i is not None and i < len(row) else '' for i in indexes)
+
+def extract_city_keys(paths: Iterable[str], usable_zips: Optional[Set[str]] = None) -> Set[str]:
+    """"City, ST" keys for rows whose zip code can't place them on the map.
+
+    A row needs its city when its zip is invalid, or (given usable_zips)
+    when the zip has no known coordinates - the same fallback script.js uses.
+    """
+    rows = set()
+    for path in paths:
+        rows.update(iter_columns(path, CITY_COLUMNS))
+    return city_keys_from_rows(rows, usable_zips)
+
+def extract_address_keys(paths: Iterable[str], workers: int = 1) -> Set[str]:
+    """Distinct normalized address keys (see normalize_address) in the CSV files"""
+    if workers > 1:
+        rows = parallel_column_sets(paths, ADDRESS_COLUMNS, workers)
+    else:
+        rows = set()
+        for path in paths:
+            rows.update(iter_columns(path, ADDRESS_COLUMNS))
+    keys = {address_key(dict(zip(ADDRESS_COLUMNS, row))) for row in rows}
+    keys.discard(None)
+    return keys
+
+def city_keys_from_rows(rows: Iterable[Tuple[str, ...]], usable_zips: Optional[Set[str]] = None) -> Set[str]:
+    """"City, ST" keys from distinct CITY_COLUMNS rows, see extract_city_keys"""
+    keys = set()
+    for zip_value, city, state in map(city_row, rows):
+        if not city or not state:
+            continue
+        zip_code = normalize_zip(zip_value)
+        if zip_code is None or (usable_zips is not None and zip_code not in usable_zips):
+            keys.add(f"{city}, {state}")
+    return keys
+
+def complete_records_end(data: bytes) -> int:
+    """Length of the longest prefix of data that ends on a record boundary (a newline outside quotes)"""
+    end = len(data)
+    while True:
+        end = data.rfind(b'\n', 0, end)
+        if end < 0:
+            return 0
+        if data.count(b'"', 0, end + 1) % 2 == 0:
+            return end + 1
+
+class CsvTail:
+    """Incremental zip code reader for a CSV that grows by appending rows.
+
+    The state file keeps the byte offset read up to, a fingerprint of the
+    bytes before it and the zip codes seen so far, so restarts stay
+    incremental too. If the file shrank or the fingerprint no longer
+    matches, it was rewritten and is rescanned from the start.
+    """
+
+    def __init__(self, path: str, state_file: str):
+        self.path = path
+        self.state_file = state_file
+        self.offset = 0
+        self.size = None
+        self.mtime_ns = None
+        self.fingerprint = None
+        self.header: Optional[List[str]] = None
+        self.zip_index: Optional[int] = None
+        self.zip_codes: Set[str] = set()
+        self.rescanned = False
+        self.tail_parsed = False
+        self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return
+        if state.get('path') != os.path.abspath(self.path):
+            return
+        self.offset, self.size, self.mtime_ns = state['offset'], state['size'], state['mtime_ns']
+        self.fingerprint = state['fingerprint']
+        self.set_header(state['header'])
+        self.zip_codes = set(state['zip_codes'])
+
+    def save_state(self):
+        write_json_atomic(self.state_file, {
+            'path': os.path.abspath(self.path),
+            'offset': self.offset,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'fingerprint': self.fingerprint,
+            'header': self.header,
+            'zip_codes': sorted(self.zip_codes)
+        }, indent=None)
+
+    def set_header(self, header: Optional[List[str]]):
+        self.header = header
+        self.zip_index = column_index(header, 'zip') if header else None
+
+    def fingerprint_at(self, file, offset: int) -> str:
+        """Hash of the first and last bytes before offset"""
+        digest = hashlib.sha256()
+        file.seek(0)
+        digest.update(file.read(min(offset, FINGERPRINT_BYTES)))
+        file.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(file.read(min(offset, FINGERPRINT_BYTES)))
+        return digest.hexdigest()
+
+    def poll(self) -> Optional[Set[str]]:
+        """Zip codes not seen before (all of them after a rescan), or None if the file is unchanged"""
+        stat = os.stat(self.path)
+        if stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns:
+            if self.offset == self.size or self.tail_parsed:
+                return None
+            # A last row without a newline that has not changed since the previous poll is finished
+            self.rescanned = False
+            self.tail_parsed = True
+            with open(self.path, 'rb') as file:
+                new_zips = self.read_unterminated_tail(file)
+            self.save_state()
+            return new_zips
+        self.tail_parsed = False
+        with open(self.path, 'rb') as file:
+            self.rescanned = (self.fingerprint is None or stat.st_size < self.offset
+                              or self.fingerprint_at(file, self.offset) != self.fingerprint)
+            if self.rescanned:
+                self.offset = 0
+                self.set_header(None)
+                self.zip_codes = set()
+            new_zips = self.read_from_offset(file)
+            self.fingerprint = self.fingerprint_at(file, self.offset)
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.save_state()
+        return new_zips
+
+    def read_from_offset(self, file) -> Set[str]:
+        """Parse complete records after the offset; a half-written last row waits for the next poll"""
+        file.seek(self.offset)
+        new_zips = set()
+        pending = b''
+        while True:
+            chunk = file.read(TAIL_CHUNK_BYTES)
+            if not chunk:
+                break
+            pending += chunk
+            end = complete_records_end(pending)
+            if end:
+                self.parse_records(pending[:end], new_zips)
+                self.offset += end
+                pending = pending[end:]
+        return new_zips
+
+    def read_unterminated_tail(self, file) -> Set[str]:
+        """Parse the bytes after the offset as a last row if its quotes are balanced
+
+        The offset stays put, so if the row turns out to continue it is
+        parsed again once its newline arrives.
+        """
+        file.seek(self.offset)
+        data = file.read()
+        new_zips = set()
+        if data.count(b'"') % 2 == 0:
+            self.parse_records(data, new_zips)
+        return new_zips
+
+    def parse_records(self, data: bytes, new_zips: Set[str]):
+        reader = csv.reader(io.StringIO(data.decode('utf-8-sig' if self.offset == 0 else 'utf-8'), newline=''))
+        if self.header is None:
+            self.set_header(next(reader, []))
+        if self.zip_index is None:
+            return
+        for row in reader:
+            if len(row) > self.zip_index:
+                zip_code = normalize_zip(row[self.zip_index])
+                if zip_code and zip_code not in self.zip_codes:
+                    self.zip_codes.add(zip_code)
+                    new_zips.add(zip_code)
+
+def first_record_end(data: bytes, quoted: bool = False) -> int:
+    """Offset just past the first newline outside quotes, or -1; quoted says data starts inside a quoted field"""
+    position = 0
+    while True:
+        newline = data.find(b'\n', position)
+        if newline < 0:
+            return -1
+        quoted ^= data.count(b'"', position, newline) % 2 == 1
+        if not quoted:
+            return newline + 1
+        position = newline + 1
+
+def read_header(path: str) -> Tuple[List[str], int]:
+    """Header row of an uncompressed CSV and the byte offset where its data starts"""
+    with open(path, 'rb') as file:
+        data = b''
+        while True:
+            chunk = file.read(FINGERPRINT_BYTES)
+            data += chunk
+            end = first_record_end(data)
+            if end >= 0 or not chunk:
+                end = len(data) if end < 0 else end
+                break
+    header = next(csv.reader(io.StringIO(data[:end].decode('utf-8'), newline='')), [])
+    return header, end
+
+def count_quotes(task: Tuple[str, int, int]) -> int:
+    """Quote characters in a byte range"""
+    path, start, end = task
+    count = 0
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while start < end:
+            chunk = file.read(min(TAIL_CHUNK_BYTES, end - start))
+            if not chunk:
+                break
+            count += chunk.count(b'"')
+            start += len(chunk)
+    return count
+
+def align_to_record(path: str, offset: int, quoted: bool, size: int) -> int:
+    """First record boundary at or after offset, given whether offset falls inside a quoted field"""
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        data = b''
+        while True:
+            chunk = file.read(FINGERPRINT_BYTES)
+            if not chunk:
+                return size
+            data += chunk
+            end = first_record_end(data, quoted)
+            if end >= 0:
+                return offset + end
+
+def record_ranges(path: str, data_start: int, pieces: int, pool: ProcessPoolExecutor) -> List[Tuple[int, int]]:
+    """Split the data part of a file into byte ranges that start and end on record boundaries.
+
+    Quotes are counted per raw range in the pool; the running parity tells
+    whether each raw split point lies inside a quoted field (which may hold
+    newlines), so it can be moved to the next real record boundary.
+    """
+    size = os.path.getsize(path)
+    step = max(1, (size - data_start) // pieces)
+    raw = list(range(data_start, size, step))[1:pieces]
+    quote_counts = list(pool.map(count_quotes, zip([path] * len(raw), [data_start] + raw, raw)))
+    bounds = [data_start]
+    parity = 0
+    for split, count in zip(raw, quote_counts):
+        parity = (parity + count) % 2
+        aligned = align_to_record(path, split, parity == 1, size)
+        if bounds[-1] < aligned < size:
+            bounds.append(aligned)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def parse_range(task: Tuple[str, int, int, Tuple[Optional[int], ...]]) -> Set[Tuple[str, ...]]:
+    """Distinct column tuples of the records in a byte range (same values as iter_columns)"""
+    path, start, end, indexes = task
+    getter = operator.itemgetter(*indexes) if None not in indexes else None
+    single = len(indexes) == 1
+    raw = set()
+
+    def parse(data: bytes):
+        for row in csv.reader(io.StringIO(data.decode('utf-8'), newline='')):
+            try:
+                raw.add(getter(row))
+            except (IndexError, TypeError):
+                # Short row or missing column
+                values = tuple(row[i] if i is not None and i < len(row) else '' for i in indexes)
+                raw.add(values[0] if single else values)
+
+    with open(path, 'rb') as file:
+        file.seek(start)
+        pending = b''
+        remaining = end - start
+        while remaining > 0:
+            chunk = file.read(min(TAIL_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            pending += chunk
+            cut = complete_records_end(pending) if remaining > 0 else len(pending)
+            parse(pending[:cut])
+            pending = pending[cut:]
+        if pending:
+            parse(pending)
+    # Strip once per distinct value rather than once per row
+    if single:
+        return {(value.strip(),) for value in raw}
+    return {tuple(value.strip() for value in values) for values in raw}
+
+def parallel_column_sets(paths: Iterable[str], columns: Tuple[str, ...], workers: int) -> Set[Tuple[str, ...]]:
+    """Distinct column tuples across CSV files, parsed as byte ranges in a process pool.
+
+    Compressed files can't be split and are read serially in this process.
+    """
+    rows = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = []
+        for path in paths:
+            if path.endswith(('.gz', '.bz2')):
+                rows.update(iter_columns(path, columns))
+                continue
+            header, data_start = read_header(path)
+            indexes = tuple(column_index(header, column) for column in columns)
+            tasks.extend((path, start, end, indexes)
+                         for start, end in record_ranges(path, data_start, 4 * workers, pool))
+        for chunk_rows in pool.map(parse_range, tasks):
+            rows.update(chunk_rows)
+    return rows
+
+def parallel_extract_zip_codes(paths: Iterable[str], workers: int, column: str = 'zip') -> Set[str]:
+    """extract_zip_codes using a process pool"""
+    zip_codes = {normalize_zip(values[0]) for values in parallel_column_sets(paths, (column,), workers)}
+    zip_codes.discard(None)
+    return zip_codes
+
+def parallel_extract_city_keys(paths: Iterable[str], usable_zips: Optional[Set[str]], workers: int) -> Set[str]:
+    """extract_city_keys using a process pool"""
+    return city_keys_from_rows(parallel_column_sets(paths, CITY_COLUMNS, workers), usable_zips)
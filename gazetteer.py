@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Offline zip code centroids from a local gazetteer file.
+Reads Census ZCTA gazetteer style TSV/CSV files (GEOID, INTPTLAT, INTPTLONG).
+"""
+
+import csv
+from typing import Dict, Set, Tuple
+
+ZIP_COLUMNS = ('geoid', 'zcta5', 'zcta5ce20', 'zcta5ce10', 'zcta', 'zip', 'zipcode', 'zip_code', 'postal_code')
+LAT_COLUMNS = ('intptlat', 'latitude', 'lat')
+LON_COLUMNS = ('intptlong', 'intptlon', 'longitude', 'lon', 'lng')
+
+def find_column(header: list, candidates: Tuple[str, ...], path: str) -> int:
+    """Index of the first candidate column present in the header"""
+    names = [name.strip().lower() for name in header]
+    for candidate in candidates:
+        if candidate in names:
+            return names.index(candidate)
+    raise ValueError(f"{path}: none of the columns {', '.join(candidates)} found")
+
+def load_gazetteer(path: str) -> Dict[str, Tuple[float, float]]:
+    """Load zip code -> (latitude, longitude) from a gazetteer file"""
+    centroids = {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        first_line = file.readline()
+        delimiter = '\t' if '\t' in first_line else ','
+        header = next(csv.reader([first_line], delimiter=delimiter))
+        zip_index = find_column(header, ZIP_COLUMNS, path)
+        lat_index = find_column(header, LAT_COLUMNS, path)
+        lon_index = find_column(header, LON_COLUMNS, path)
+        width = max(zip_index, lat_index, lon_index)
+
+        for row in csv.reader(file, delimiter=delimiter):
+            if len(row) <= width:
+                continue
+            zip_code = row[zip_index].strip()
+            if not zip_code.isdigit() or len(zip_code) > 5:
+                continue
+            try:
+                centroids[zip_code.zfill(5)] = (float(row[lat_index]), float(row[lon_index]))
+            except ValueError:
+                continue
+    return centroids
+
+def resolve_from_gazetteer(zip_codes: Set[str],
+                           centroids: Dict[str, Tuple[float, float]]) -> Tuple[Dict[str, Dict[str, float]], Set[str]]:
+    """Join zip codes against the gazetteer in one pass; return (coordinates, uncovered zip codes)"""
+    covered = zip_codes & centroids.keys()
+    coordinates = {
+        zip_code: {'latitude': centroids[zip_code][0], 'longitude': centroids[zip_code][1]}
+        for zip_code in covered
+    }
+    return coordinates, zip_codes - covered
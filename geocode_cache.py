@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite cache of geocoder answers.
+Stores successes, "no result" answers and transient errors, each with its own TTL.
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+STATUS_OK = 'ok'
+STATUS_NO_RESULT = 'no_result'
+STATUS_ERROR = 'error'
+
+DAY = 24 * 60 * 60
+DEFAULT_TTLS = {
+    STATUS_OK: 365 * DAY,
+    STATUS_NO_RESULT: 90 * DAY,
+    STATUS_ERROR: 60 * 60,
+}
+
+DEFAULT_CACHE_FILE = "geocode_cache.sqlite"
+
+@dataclass
+class CacheEntry:
+    status: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    detail: str
+    created_at: float
+    expires_at: float
+
+class GeocodeCache:
+    """Geocoder answers keyed by (provider, query); safe to share between threads"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                detail TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            )
+        ''')
+
+    def get(self, provider: str, query: str) -> Optional[CacheEntry]:
+        """Return the unexpired entry for a query, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT status, latitude, longitude, detail, created_at, expires_at '
+                'FROM geocode_cache WHERE provider = ? AND query = ? AND expires_at > ?',
+                (provider, query, time.time())
+            ).fetchone()
+            return CacheEntry(*row) if row else None
+
+    def put(self, provider: str, query: str, status: str,
+            coordinates: Optional[Tuple[float, float]] = None, detail: str = ''):
+        """Store an answer, replacing any previous one for the same query"""
+        now = time.time()
+        latitude, longitude = coordinates if coordinates else (None, None)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO geocode_cache '
+                '(provider, query, status, latitude, longitude, detail, created_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (provider, query, status, latitude, longitude, detail, now, now + self.ttls[status])
+            )
+
+    def report(self) -> Iterable[Tuple[str, str, int, int]]:
+        """Rows of (provider, status, entries, expired entries)"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT provider, status, COUNT(*), SUM(expires_at <= ?) '
+                'FROM geocode_cache GROUP BY provider, status ORDER BY provider, status',
+                (time.time(),)
+            ).fetchall()
+
+    def prune(self, statuses: Optional[Iterable[str]] = None, expired_only: bool = True) -> int:
+        """Delete expired entries (optionally limited to some statuses) and return how many"""
+        clauses, params = [], []
+        if expired_only:
+            clauses.append('expires_at <= ?')
+            params.append(time.time())
+        if statuses:
+            statuses = list(statuses)
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.lock:
+            deleted = self.conn.execute(f'DELETE FROM geocode_cache{where}', params).rowcount
+            self.conn.execute('VACUUM')
+        return deleted
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Report on or prune the geocode cache.')
+    parser.add_argument('command', choices=['report', 'prune'])
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help='cache database file')
+    parser.add_argument('--status', action='append', choices=list(DEFAULT_TTLS),
+                        help='only prune entries with this status (repeatable)')
+    parser.add_argument('--all', action='store_true', help='prune unexpired entries too')
+    args = parser.parse_args()
+
+    cache = GeocodeCache(args.cache)
+    try:
+        if args.command == 'prune':
+            deleted = cache.prune(statuses=args.status, expired_only=not args.all)
+            print(f"🧹 Pruned {deleted} cache entries from {args.cache}")
+
+        rows = cache.report()
+        print(f"\n=== Geocode cache: {args.cache} ===")
+        if not rows:
+            print("(empty)")
+        for provider, status, count, expired in rows:
+            print(f"{provider}  {status:<10} {count:>7} entries  ({expired or 0} expired)")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Pluggable geocoder providers.
+An ordered fallback chain of providers, each with its own rate limit, with
+optional hedged requests to the next provider when one is slow to answer.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, List, Optional
+
+from geocoding import NoResultError, RateLimitedError, TokenBucket, TransientGeocodeError
+
+TOKEN_POLL_SECONDS = 0.05  # how often a hedged query checks whether its latest request got a token
+
+class AbandonedError(Exception):
+    """A hedged request given up before it took a rate-limit token"""
+
+class GeocoderProvider:
+    """A named geocoder; subclasses implement lookup(query)"""
+
+    def __init__(self, name: str, rate: Optional[float] = None, burst: int = 1):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+
+    def lookup(self, query: str) -> tuple:
+        raise NotImplementedError
+
+    def cached(self, query: str) -> Optional[tuple]:
+        """Answer without a request, if possible (None otherwise); raises for known misses"""
+        return None
+
+    def geocode(self, query: str, cancelled: Optional[threading.Event] = None,
+                on_request: Optional[Callable[[], None]] = None) -> tuple:
+        """Answer from cache, or wait for this provider's rate limit and look the query up.
+
+        Setting cancelled while waiting for a token gives up without taking
+        one (AbandonedError); on_request is called once the token is taken.
+        """
+        result = self.cached(query)
+        if result is not None:
+            return result
+        if not self.bucket.acquire(cancelled):
+            raise AbandonedError(f"{self.name}: no longer needed")
+        if on_request:
+            on_request()
+        try:
+            return self.lookup(query)
+        except RateLimitedError as e:
+            self.bucket.pause(e.retry_after if e.retry_after is not None else 1.0)
+            raise
+
+class FunctionProvider(GeocoderProvider):
+    """Provider backed by plain functions, e.g. get_coordinates_from_zip bound to one endpoint"""
+
+    def __init__(self, name: str, fetch: Callable[[str], tuple],
+                 cached: Optional[Callable[[str], Optional[tuple]]] = None,
+                 rate: Optional[float] = None, burst: int = 1):
+        super().__init__(name, rate, burst)
+        self.fetch = fetch
+        self.cached_lookup = cached
+
+    def lookup(self, query: str) -> tuple:
+        return self.fetch(query)
+
+    def cached(self, query: str) -> Optional[tuple]:
+        return self.cached_lookup(query) if self.cached_lookup else None
+
+class HedgedRequest:
+    """One provider's part in a hedged query"""
+
+    def __init__(self, provider: GeocoderProvider):
+        self.provider = provider
+        self.cancelled = threading.Event()
+        self.started_at: Optional[float] = None
+        self.future = None
+
+    def mark_started(self):
+        self.started_at = time.monotonic()
+
+def start_thread(fn: Callable, *args) -> Future:
+    """Run fn(*args) on a new daemon thread; cancelling the future before the thread starts skips the call"""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+class ProviderChain:
+    """Try providers in order until one answers.
+
+    With hedge_after set, a provider that has not answered within that many
+    seconds gets a backup request sent to the next provider, and whichever
+    answer arrives first wins. A miss or failure moves on to the next
+    provider straight away.
+
+    Each hedged request gets its own thread rather than a slot in a fixed
+    pool: a request that lost the race keeps running until its answer
+    arrives, and in a pool those would leave new hedges queued behind them.
+    How many stay open is bounded by each provider's rate limit.
+    """
+
+    def __init__(self, providers: List[GeocoderProvider], hedge_after: Optional[float] = None):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.wins = Counter()
+        self.requests = Counter()
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def geocode(self, query: str) -> tuple:
+        if self.hedge_after is None:
+            return self.geocode_in_order(query)
+        return self.geocode_hedged(query)
+
+    def geocode_in_order(self, query: str) -> tuple:
+        errors = []
+        for provider in self.providers:
+            try:
+                result = provider.geocode(query, on_request=lambda: self.record_request(provider))
+            except Exception as e:
+                errors.append(e)
+                continue
+            self.record_win(provider)
+            return result
+        raise self.combined_error(errors)
+
+    def geocode_hedged(self, query: str) -> tuple:
+        """Race providers; the hedge clock for a request only starts once it has its rate-limit token"""
+        errors = []
+        requests = []
+
+        def launch():
+            request = HedgedRequest(self.providers[len(requests)])
+
+            def started():
+                request.mark_started()
+                self.record_request(request.provider)
+
+            request.future = start_thread(request.provider.geocode, query, request.cancelled, started)
+            requests.append(request)
+
+        launch()
+        try:
+            while True:
+                pending = [request for request in requests if not request.future.done()]
+                if not pending:
+                    break
+                latest = requests[-1]
+                if len(requests) == len(self.providers):
+                    timeout = None
+                elif latest.started_at is None:
+                    # Waiting on a rate limit is not slowness; check back until the request is sent
+                    timeout = TOKEN_POLL_SECONDS
+                else:
+                    timeout = max(0.0, latest.started_at + self.hedge_after - time.monotonic())
+                done, _ = wait([request.future for request in pending], timeout=timeout,
+                               return_when=FIRST_COMPLETED)
+                for request in pending:
+                    if request.future not in done:
+                        continue
+                    try:
+                        result = request.future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    self.record_win(request.provider)
+                    return result
+                if len(requests) < len(self.providers) and (
+                        (done and all(request.future.done() for request in requests))
+                        or (not done and latest.started_at is not None
+                            and time.monotonic() >= latest.started_at + self.hedge_after)):
+                    if not done:
+                        with self.lock:
+                            self.hedges += 1
+                    launch()
+        finally:
+            # Requests still waiting for a token give up without spending it; sent ones finish unread
+            for request in requests:
+                request.cancelled.set()
+                request.future.cancel()
+        raise self.combined_error(errors)
+
+    def cached(self, query: str) -> Optional[tuple]:
+        """First cached answer in provider order, for the scheduler's lookup.
+
+        Raises NoResultError only when every provider has a cached miss;
+        otherwise a query some provider could still answer falls through to
+        the network (where cached misses skip their provider).
+        """
+        misses = 0
+        for provider in self.providers:
+            try:
+                result = provider.cached(query)
+            except NoResultError:
+                misses += 1
+                continue
+            except Exception:
+                continue
+            if result is not None:
+                self.record_win(provider)
+                return result
+        if misses == len(self.providers):
+            raise NoResultError('No coordinates found by any provider (cached)')
+        return None
+
+    def record_win(self, provider: GeocoderProvider):
+        with self.lock:
+            self.wins[provider.name] += 1
+
+    def record_request(self, provider: GeocoderProvider):
+        """Count a request actually sent (its rate-limit token taken), fallbacks and hedges included"""
+        with self.lock:
+            self.requests[provider.name] += 1
+
+    @staticmethod
+    def combined_error(errors: List[Exception]) -> Exception:
+        """NoResultError only if every provider said so; rate limiting is passed on so the key is retried"""
+        if errors and all(isinstance(error, NoResultError) for error in errors):
+            return NoResultError('No coordinates found by any provider')
+        rate_limited = [error for error in errors if isinstance(error, RateLimitedError)]
+        if rate_limited:
+            return RateLimitedError(min((error.retry_after for error in rate_limited
+                                         if error.retry_after is not None), default=None))
+        return TransientGeocodeError('; '.join(str(error) for error in errors) or 'No providers')
+
+    def summary(self) -> str:
+        wins = ', '.join(f"{provider.name}: {self.wins[provider.name]}" for provider in self.providers)
+        requests = ', '.join(f"{provider.name}: {self.requests[provider.name]}" for provider in self.providers)
+        return f"answers by provider - {wins}; requests - {requests}; {self.hedges} hedged requests"
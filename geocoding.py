@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Concurrent geocoding scheduler and HTTP helpers.
+Runs many geocoder requests in flight behind a shared token-bucket rate limit,
+over a pooled keep-alive session with bounded, jittered retries.
+"""
+
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'OrganizationSearch/1.0'
+
+class RateLimitedError(Exception):
+    """Raised when the geocoder answers 429 Too Many Requests"""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"Rate limited (retry after {retry_after}s)" if retry_after else "Rate limited")
+        self.retry_after = retry_after
+
+class NoResultError(Exception):
+    """The geocoder answered, but has no coordinates for the query"""
+
+class TransientGeocodeError(Exception):
+    """The lookup failed for a reason that may go away; try again later"""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Shared keep-alive session whose connection pool fits pool_size concurrent requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+class LatencyRecorder:
+    """Thread-safe collection of per-attempt request latencies"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "no requests"
+        return (f"p50 {self.percentile(0.5) * 1000:.0f}ms, p95 {self.percentile(0.95) * 1000:.0f}ms, "
+                f"max {max(self.samples) * 1000:.0f}ms over {len(self.samples)} attempts")
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def get_with_retries(session, url: str, params: Dict[str, Any], timeout: float = 10,
+                     max_attempts: int = 3, latency: Optional[LatencyRecorder] = None) -> requests.Response:
+    """GET with bounded retries on timeouts, connection errors and 5xx answers.
+
+    429 is raised as RateLimitedError right away so the scheduler can slow
+    everyone down; running out of attempts raises TransientGeocodeError.
+    """
+    error = None
+    for attempt in range(max_attempts):
+        start = time.perf_counter()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            error = e
+        else:
+            if response.status_code == 429:
+                raise RateLimitedError(parse_retry_after(response.headers.get('Retry-After')))
+            if response.status_code < 500:
+                return response
+            error = TransientGeocodeError(f"HTTP {response.status_code}")
+        finally:
+            if latency is not None:
+                latency.record(time.perf_counter() - start)
+        if attempt + 1 < max_attempts:
+            time.sleep(backoff_delay(attempt))
+    raise TransientGeocodeError(f"{error} (after {max_attempts} attempts)")
+
+class TokenBucket:
+    """Thread-safe token bucket deciding when the next request may start"""
+
+    def __init__(self, rate: Optional[float], capacity: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = max(float(capacity), 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, cancelled: Optional[threading.Event] = None) -> bool:
+        """Block until a token is available; False (no token taken) if cancelled is set first"""
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                return False
+            with self.lock:
+                now = self.clock()
+                if now < self.updated:
+                    # Paused by a Retry-After until self.updated
+                    wait = self.updated - now
+                elif not self.rate:
+                    return True
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait = (1 - self.tokens) / self.rate
+            if cancelled is not None:
+                cancelled.wait(wait)
+            else:
+                self.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the given number of seconds"""
+        with self.lock:
+            resume_at = self.clock() + seconds
+            if resume_at > self.updated:
+                self.updated = resume_at
+                self.tokens = 0.0
+
+@dataclass
+class GeocodeRun:
+    """Results and throughput of one concurrent geocoding run"""
+    results: Dict[Any, Any] = field(default_factory=dict)
+    failed: Dict[Any, Exception] = field(default_factory=dict)
+    requests: int = 0
+    cached: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+def geocode_key(key: Any, geocode: Callable[[Any], Any], bucket: TokenBucket, run: GeocodeRun,
+                counter_lock: threading.Lock, lookup: Optional[Callable[[Any], Any]] = None,
+                max_rate_limit_retries: int = 5) -> tuple:
+    """Resolve one key through lookup, then the rate-limited geocoder; return (key, value, error)"""
+    if lookup is not None:
+        try:
+            value = lookup(key)
+        except Exception as e:
+            value, error = None, e
+        else:
+            error = None
+        if value is not None or error is not None:
+            with counter_lock:
+                run.cached += 1
+            return key, value, error
+
+    attempt = 0
+    while True:
+        bucket.acquire()
+        with counter_lock:
+            run.requests += 1
+        try:
+            return key, geocode(key), None
+        except RateLimitedError as e:
+            with counter_lock:
+                run.rate_limited += 1
+            if attempt >= max_rate_limit_retries:
+                return key, None, e
+            bucket.pause(e.retry_after if e.retry_after is not None else min(60.0, 2.0 ** attempt))
+            attempt += 1
+        except Exception as e:
+            return key, None, e
+
+def record_result(run: GeocodeRun, key: Any, value: Any, error: Optional[Exception]):
+    if error is None:
+        run.results[key] = value
+    else:
+        run.failed[key] = error
+
+def geocode_concurrently(keys: Iterable[Any],
+                         geocode: Callable[[Any], Any],
+                         workers: int = 4,
+                         rate: Optional[float] = 1.0,
+                         burst: int = 1,
+                         max_rate_limit_retries: int = 5,
+                         on_result: Optional[Callable[[Any, Any, Optional[Exception]], None]] = None,
+                         lookup: Optional[Callable[[Any], Any]] = None) -> GeocodeRun:
+    """Geocode keys with a worker pool, at most `rate` request starts per second.
+
+    A RateLimitedError pauses the whole bucket for its Retry-After (or an
+    exponential fallback) and the key is retried; any other exception is a
+    failure for that key. lookup(key), if given, is tried first without
+    taking a token (e.g. a cache); returning None falls through to geocode.
+    on_result(key, value, error) is called from the calling thread as
+    results complete.
+    """
+    bucket = TokenBucket(rate, burst)
+    run = GeocodeRun()
+    counter_lock = threading.Lock()
+
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = [pool.submit(geocode_key, key, geocode, bucket, run, counter_lock, lookup, max_rate_limit_retries)
+                   for key in keys]
+        for future in as_completed(futures):
+            key, value, error = future.result()
+            record_result(run, key, value, error)
+            if on_result:
+                on_result(key, value, error)
+    except BaseException:
+        # Don't let Ctrl-C wait for every queued key to be geocoded
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    run.elapsed = time.monotonic() - start
+    return run
+
+STREAM_END = object()
+
+def geocode_streaming(keys: Iterable[Any],
+                      geocode: Callable[[Any], Any],
+                      workers: int = 4,
+                      rate: Optional[float] = 1.0,
+                      burst: int = 1,
+                      max_rate_limit_retries: int = 5,
+                      on_result: Optional[Callable[[Any, Any, Optional[Exception]], None]] = None,
+                      lookup: Optional[Callable[[Any], Any]] = None,
+                      queue_size: Optional[int] = None) -> GeocodeRun:
+    """geocode_concurrently for keys that are still being produced (e.g. read from a CSV).
+
+    A reader thread drains the keys iterable into a bounded queue that the
+    workers take from, and the workers hand results to the calling thread,
+    which runs on_result, through a second bounded queue. A slow geocoder
+    holds the reader back and a slow on_result holds the workers back, so
+    neither buffers more than queue_size items (default: 4 per worker).
+    An exception raised by the keys iterable is re-raised once the keys it
+    produced have been reported.
+    """
+    workers = max(1, workers)
+    queue_size = queue_size or 4 * workers
+    bucket = TokenBucket(rate, burst)
+    run = GeocodeRun()
+    counter_lock = threading.Lock()
+    key_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    reader_errors = []
+
+    # Waits re-check stop so threads wind down once the calling thread gives up
+    def put(target, item):
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def get(source):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return STREAM_END
+
+    def read():
+        try:
+            for key in keys:
+                if stop.is_set():
+                    return
+                put(key_queue, key)
+        except Exception as e:
+            reader_errors.append(e)
+        finally:
+            for _ in range(workers):
+                put(key_queue, STREAM_END)
+
+    def work():
+        try:
+            while True:
+                key = get(key_queue)
+                if key is STREAM_END:
+                    return
+                put(result_queue, geocode_key(key, geocode, bucket, run, counter_lock, lookup,
+                                              max_rate_limit_retries))
+        finally:
+            put(result_queue, STREAM_END)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=read, name='geocode-reader', daemon=True)]
+    threads += [threading.Thread(target=work, name=f'geocode-worker-{i}', daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    running = workers
+    try:
+        while running:
+            item = result_queue.get()
+            if item is STREAM_END:
+                running -= 1
+                continue
+            key, value, error = item
+            record_result(run, key, value, error)
+            if on_result:
+                on_result(key, value, error)
+    finally:
+        # On Ctrl-C, don't wait for the rest of the input to be geocoded
+        stop.set()
+    for thread in threads:
+        thread.join()
+    run.elapsed = time.monotonic() - start
+    if reader_errors:
+        raise reader_errors[0]
+    return run
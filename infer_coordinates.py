@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Network-free coordinate estimates for zip codes the geocoder can't place.
+Uses only the existing zip coordinate table and the CSV: the centroid of
+known zips sharing the ZIP3 prefix and city/state, else the ZIP3 prefix
+alone, else the numerically nearest known zips in the same state. Each
+estimate carries a confidence and the method that produced it.
+"""
+
+import argparse
+import json
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from build_spatial_index import haversine_miles
+from checkpoint import write_json_atomic
+from csv_ingest import CITY_COLUMNS, city_row, expand_csv_paths, iter_columns, normalize_zip
+
+# Base confidence per method, scaled down by how spread out the source zips are
+METHOD_CONFIDENCE = {
+    'zip3_city': 0.8,
+    'zip3': 0.6,
+    'nearest_zips': 0.4
+}
+SPREAD_SCALE_MILES = 50.0
+
+def zip_places(csv_paths: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+    """Most common (city, state) the CSV gives for each zip code"""
+    counts = defaultdict(Counter)
+    for path in csv_paths:
+        for zip_value, city, state in map(city_row, iter_columns(path, CITY_COLUMNS)):
+            zip_code = normalize_zip(zip_value)
+            if zip_code and state:
+                counts[zip_code][(city.lower(), state.upper())] += 1
+    return {zip_code: places.most_common(1)[0][0] for zip_code, places in counts.items()}
+
+def centroid(points: List[Tuple[float, float]]) -> Tuple[float, float, float]:
+    """Mean position and the distance in miles from it to the farthest point"""
+    lat = sum(point[0] for point in points) / len(points)
+    lon = sum(point[1] for point in points) / len(points)
+    spread = max(haversine_miles(lat, lon, point[0], point[1]) for point in points)
+    return lat, lon, spread
+
+def estimate(method: str, members: List[str], known: Dict[str, Dict[str, float]]) -> Dict:
+    lat, lon, spread = centroid([(known[zip_code]['latitude'], known[zip_code]['longitude'])
+                                 for zip_code in members])
+    return {
+        'latitude': round(lat, 6),
+        'longitude': round(lon, 6),
+        'confidence': round(METHOD_CONFIDENCE[method] / (1 + spread / SPREAD_SCALE_MILES), 2),
+        'method': method,
+        'based_on': len(members)
+    }
+
+def nearest_zips(zip_code: str, state_zips: List[int], count: int) -> List[str]:
+    """The count known zips closest in value to zip_code (state_zips sorted)"""
+    target = int(zip_code)
+    i = bisect_left(state_zips, target)
+    lo, hi = i - 1, i
+    chosen = []
+    while len(chosen) < count and (lo >= 0 or hi < len(state_zips)):
+        if hi >= len(state_zips) or (lo >= 0 and target - state_zips[lo] <= state_zips[hi] - target):
+            chosen.append(state_zips[lo])
+            lo -= 1
+        else:
+            chosen.append(state_zips[hi])
+            hi += 1
+    return [f"{value:05d}" for value in chosen]
+
+def infer_coordinates(unresolved: Set[str], known: Dict[str, Dict[str, float]],
+                      places: Dict[str, Tuple[str, str]], neighbors: int = 2) -> Dict[str, Dict]:
+    """Estimate coordinates for unresolved zips from known ones; zips with no basis are left out"""
+    by_city = defaultdict(list)
+    by_prefix = defaultdict(list)
+    by_state = defaultdict(list)
+    for zip_code in known:
+        by_prefix[zip_code[:3]].append(zip_code)
+        if zip_code in places:
+            city, state = places[zip_code]
+            by_city[(zip_code[:3], city, state)].append(zip_code)
+            by_state[state].append(int(zip_code))
+    for values in by_state.values():
+        values.sort()
+
+    inferred = {}
+    for zip_code in sorted(unresolved):
+        city, state = places.get(zip_code, ('', ''))
+        members = by_city.get((zip_code[:3], city, state)) if state else None
+        if members:
+            inferred[zip_code] = estimate('zip3_city', members, known)
+            continue
+        # A prefix can straddle a state line; drop zips the CSV places in another state
+        members = [member for member in by_prefix.get(zip_code[:3], [])
+                   if not state or places.get(member, ('', state))[1] == state]
+        if members:
+            inferred[zip_code] = estimate('zip3', members, known)
+            continue
+        if state and by_state.get(state):
+            inferred[zip_code] = estimate('nearest_zips', nearest_zips(zip_code, by_state[state], neighbors), known)
+    return inferred
+
+def build_inferred_coordinates(csv_paths: Iterable[str], zip_json: str, output: str,
+                               neighbors: int = 2) -> Tuple[Dict[str, Dict], List[str]]:
+    """Infer every CSV zip without coordinates and write the result; return (inferred, still unresolved)"""
+    with open(zip_json, 'r', encoding='utf-8') as file:
+        known = json.load(file).get('coordinates', {})
+    places = zip_places(expand_csv_paths(csv_paths))
+    unresolved = set(places) - set(known)
+    inferred = infer_coordinates(unresolved, known, places, neighbors)
+    remaining = sorted(unresolved - set(inferred))
+    methods = Counter(entry['method'] for entry in inferred.values())
+    result = {
+        'metadata': {
+            'total_inferred': len(inferred),
+            'unresolved': len(remaining),
+            'by_method': dict(methods),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Estimated coordinates for zip codes the geocoder could not place (coordinateSource "inferred")'
+        },
+        'coordinates': inferred,
+        'unresolved_zips': remaining
+    }
+    write_json_atomic(output, result)
+    return inferred, remaining
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate coordinates for unresolved zip codes without the network.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--output', default='inferred_coordinates.json')
+    parser.add_argument('--neighbors', type=int, default=2, help='known zips averaged by the nearest-zip method')
+    args = parser.parse_args()
+
+    print("=== Inferring coordinates for unresolved zip codes ===")
+    inferred, remaining = build_inferred_coordinates(args.csv, args.zip_json, args.output, args.neighbors)
+    methods = Counter(entry['method'] for entry in inferred.values())
+    print(f"Inferred {len(inferred)} zip codes into {args.output}")
+    for method in METHOD_CONFIDENCE:
+        confidences = [entry['confidence'] for entry in inferred.values() if entry['method'] == method]
+        if confidences:
+            print(f"   {method:<13} {methods[method]:>5}  (mean confidence {sum(confidences) / len(confidences):.2f})")
+    print(f"❌ No basis for an estimate: {len(remaining)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Vectorized proximity queries over geocoded organizations.
+Batched radius and k-nearest searches with NumPy haversine behind a grid
+prefilter, plus a ZIP x radius x housing type coverage report.
+"""
+
+import argparse
+import csv
+import json
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from build_organizations import load_organizations
+from build_spatial_index import EARTH_RADIUS_MILES, MILES_PER_DEGREE_LAT
+
+def haversine_miles_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Broadcasting great-circle distance in miles; inputs in degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(values) for values in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class ProximityIndex:
+    """Points bucketed into a fixed-degree grid for radius and k-nearest queries"""
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, categories: np.ndarray,
+                 category_names: List[str], cell_size: float = 1.0):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.categories = np.asarray(categories, dtype=np.int64)
+        self.category_names = category_names
+        self.cell_size = cell_size
+
+        cells = defaultdict(list)
+        lat_cells = np.floor(self.lats / cell_size).astype(np.int64)
+        lon_cells = np.floor(self.lons / cell_size).astype(np.int64)
+        for i, cell in enumerate(zip(lat_cells.tolist(), lon_cells.tolist())):
+            cells[cell].append(i)
+        self.cells = {cell: np.array(indices, dtype=np.int64) for cell, indices in cells.items()}
+
+    @classmethod
+    def from_organizations(cls, organizations: List[Dict], cell_size: float = 1.0) -> 'ProximityIndex':
+        geocoded = [org for org in organizations if org['latitude'] is not None]
+        category_names = sorted({org['type'] for org in geocoded})
+        codes = {name: i for i, name in enumerate(category_names)}
+        index = cls(
+            np.array([org['latitude'] for org in geocoded]),
+            np.array([org['longitude'] for org in geocoded]),
+            np.array([codes[org['type']] for org in geocoded], dtype=np.int64),
+            category_names,
+            cell_size
+        )
+        index.organizations = geocoded
+        return index
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def candidates(self, south: float, west: float, north: float, east: float, radius_miles: float) -> np.ndarray:
+        """Indices of points in grid cells that may lie within radius of the box"""
+        lat_margin = radius_miles / MILES_PER_DEGREE_LAT
+        widest = min(89.0, max(abs(south - lat_margin), abs(north + lat_margin)))
+        lon_margin = radius_miles / (MILES_PER_DEGREE_LAT * math.cos(math.radians(widest)))
+        size = self.cell_size
+        chunks = [
+            self.cells[(lat_cell, lon_cell)]
+            for lat_cell in range(math.floor((south - lat_margin) / size), math.floor((north + lat_margin) / size) + 1)
+            for lon_cell in range(math.floor((west - lon_margin) / size), math.floor((east + lon_margin) / size) + 1)
+            if (lat_cell, lon_cell) in self.cells
+        ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def within_radius(self, lat: float, lon: float, radius_miles: float,
+                      category: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances) of points within radius, nearest first"""
+        candidates = self.candidates(lat, lon, lat, lon, radius_miles)
+        if category is not None:
+            candidates = candidates[self.categories[candidates] == category]
+        distances = haversine_miles_np(lat, lon, self.lats[candidates], self.lons[candidates])
+        keep = distances <= radius_miles
+        candidates, distances = candidates[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+
+    def k_nearest(self, lat: float, lon: float, k: int,
+                  category: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances) of the k nearest points, widening the search radius as needed"""
+        radius = 25.0
+        while True:
+            indices, distances = self.within_radius(lat, lon, radius, category)
+            if len(indices) >= k or radius > 2 * math.pi * EARTH_RADIUS_MILES:
+                return indices[:k], distances[:k]
+            radius *= 2
+
+    def coverage(self, query_lats: np.ndarray, query_lons: np.ndarray, radii: List[float]) -> np.ndarray:
+        """Counts of points per category within each radius of each query: shape (queries, radii, categories).
+
+        Queries are grouped by grid cell so each group shares one candidate
+        set and one (queries x candidates) distance matrix.
+        """
+        query_lats = np.asarray(query_lats, dtype=np.float64)
+        query_lons = np.asarray(query_lons, dtype=np.float64)
+        counts = np.zeros((len(query_lats), len(radii), len(self.category_names)), dtype=np.int32)
+        max_radius = max(radii)
+        size = self.cell_size
+
+        groups = defaultdict(list)
+        lat_cells = np.floor(query_lats / size).astype(np.int64)
+        lon_cells = np.floor(query_lons / size).astype(np.int64)
+        for i, cell in enumerate(zip(lat_cells.tolist(), lon_cells.tolist())):
+            groups[cell].append(i)
+
+        for (lat_cell, lon_cell), members in groups.items():
+            members = np.array(members, dtype=np.int64)
+            candidates = self.candidates(lat_cell * size, lon_cell * size,
+                                         (lat_cell + 1) * size, (lon_cell + 1) * size, max_radius)
+            if len(candidates) == 0:
+                continue
+            distances = haversine_miles_np(query_lats[members, None], query_lons[members, None],
+                                           self.lats[None, candidates], self.lons[None, candidates])
+            one_hot = np.zeros((len(candidates), len(self.category_names)), dtype=np.int32)
+            one_hot[np.arange(len(candidates)), self.categories[candidates]] = 1
+            for r, radius in enumerate(radii):
+                counts[members, r, :] = (distances <= radius).astype(np.int32) @ one_hot
+        return counts
+
+def load_zip_points(zip_json: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Zip codes and their coordinates as parallel arrays"""
+    with open(zip_json, 'r', encoding='utf-8') as file:
+        coordinates = json.load(file).get('coordinates', {})
+    zip_codes = sorted(coordinates)
+    lats = np.array([coordinates[zip_code]['latitude'] for zip_code in zip_codes])
+    lons = np.array([coordinates[zip_code]['longitude'] for zip_code in zip_codes])
+    return zip_codes, lats, lons
+
+def write_coverage_table(path: str, zip_codes: List[str], radii: List[float], category_names: List[str],
+                         counts: np.ndarray):
+    """One row per (zip, radius) with a count column per housing type"""
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['zip', 'radius_miles', *category_names, 'total'])
+        for i, zip_code in enumerate(zip_codes):
+            for r, radius in enumerate(radii):
+                row = counts[i, r].tolist()
+                writer.writerow([zip_code, f"{radius:g}", *row, sum(row)])
+
+def main():
+    parser = argparse.ArgumentParser(description='Proximity queries over geocoded organizations.')
+    parser.add_argument('command', choices=['coverage', 'near', 'nearest'])
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--city-json', default='city_coordinates.json')
+    parser.add_argument('--inferred-json', help='also place organizations by infer_coordinates.py estimates')
+    parser.add_argument('--address-json', help='also place organizations by update_coordinates.py --addresses results')
+    parser.add_argument('--radii', type=float, nargs='+', default=[10, 25, 50], help='coverage radii in miles')
+    parser.add_argument('--output', default='zip_coverage.csv', help='coverage table to write')
+    parser.add_argument('--zip', help='zip code to search around (near/nearest)')
+    parser.add_argument('--radius', type=float, default=10, help='search radius in miles (near)')
+    parser.add_argument('-k', type=int, default=10, help='number of results (nearest)')
+    parser.add_argument('--type', default='', help='only this housing type (near/nearest)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    organizations = load_organizations(args.csv, args.zip_json, args.city_json, args.inferred_json,
+                                       args.address_json)
+    index = ProximityIndex.from_organizations(organizations)
+    zip_codes, lats, lons = load_zip_points(args.zip_json)
+    print(f"Loaded {len(index)} geocoded organizations and {len(zip_codes)} zip codes "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    if args.command == 'coverage':
+        start = time.perf_counter()
+        counts = index.coverage(lats, lons, args.radii)
+        write_coverage_table(args.output, zip_codes, args.radii, index.category_names, counts)
+        print(f"✅ Wrote {len(zip_codes)} x {len(args.radii)} x {len(index.category_names)} coverage table "
+              f"to {args.output} in {time.perf_counter() - start:.2f}s")
+        return
+
+    if args.zip not in zip_codes:
+        print(f"❌ No coordinates for zip code {args.zip}")
+        return
+    position = zip_codes.index(args.zip)
+    category = index.category_names.index(args.type) if args.type in index.category_names else None
+    if args.type and category is None:
+        print(f"❌ Unknown housing type '{args.type}'")
+        return
+    if args.command == 'near':
+        indices, distances = index.within_radius(lats[position], lons[position], args.radius, category)
+    else:
+        indices, distances = index.k_nearest(lats[position], lons[position], args.k, category)
+    for i, distance in zip(indices.tolist(), distances.tolist()):
+        org = index.organizations[i]
+        print(f"{distance:6.1f} mi  {org['name']} ({org['type']}) - {org['city']}, {org['state']} {org['zip']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Content-hashed, immutable coordinate artifacts for clients.
+
+Publishes zip_coordinates.json (or city_coordinates.json) into an output
+directory as <name>.<hash>.json, where the hash covers the file's exact
+bytes, so a client can cache each version forever. Alongside it goes
+<name>.<old>-<new>.delta.json with the entries added, changed and removed
+since each recently published version, and a small <name>.manifest.json
+saying which version is current and which deltas lead to it.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from checkpoint import write_bytes_atomic, write_json_atomic
+
+ENTRY_KEYS = ('coordinates', 'city_coordinates', 'addresses')
+VOLATILE_METADATA = ('last_updated', 'generated_at')
+HASH_LENGTH = 16
+
+def canonical_content(data: Dict) -> Dict:
+    """The data without run timestamps, so unchanged coordinates hash the same"""
+    content = dict(data)
+    content['metadata'] = {key: value for key, value in data.get('metadata', {}).items()
+                           if key not in VOLATILE_METADATA}
+    return content
+
+def encode_content(content: Dict) -> bytes:
+    return json.dumps(content, separators=(',', ':'), sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+def content_hash(encoded: bytes) -> str:
+    return hashlib.sha256(encoded).hexdigest()[:HASH_LENGTH]
+
+def entries_key(content: Dict) -> str:
+    for key in ENTRY_KEYS:
+        if key in content:
+            return key
+    raise ValueError(f"No {' or '.join(ENTRY_KEYS)} in coordinates file")
+
+def compute_delta(old: Dict, new: Dict) -> Dict:
+    """Entries added, changed and removed, plus any other top-level value that changed"""
+    key = entries_key(new)
+    old_entries, new_entries = old.get(key, {}), new[key]
+    return {
+        'added': {name: entry for name, entry in new_entries.items() if name not in old_entries},
+        'changed': {name: entry for name, entry in new_entries.items()
+                    if name in old_entries and old_entries[name] != entry},
+        'removed': sorted(name for name in old_entries if name not in new_entries),
+        'replaced': {field: value for field, value in new.items() if field != key and old.get(field) != value}
+    }
+
+def apply_delta(content: Dict, delta: Dict) -> Dict:
+    """The newer version, rebuilt from an older one and the delta between them"""
+    key = entries_key(content)
+    entries = dict(content[key])
+    entries.update(delta['added'])
+    entries.update(delta['changed'])
+    for name in delta['removed']:
+        entries.pop(name, None)
+    return {**content, **delta['replaced'], key: entries}
+
+def load_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def publish_artifacts(json_file: str, output_dir: str = 'dist', keep: int = 5) -> Tuple[Dict, bool]:
+    """Publish the current contents of json_file; return (manifest, whether a new version was written)"""
+    name = os.path.splitext(os.path.basename(json_file))[0]
+    manifest_path = os.path.join(output_dir, f"{name}.manifest.json")
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(json_file, 'r', encoding='utf-8') as file:
+        content = canonical_content(json.load(file))
+    encoded = encode_content(content)
+    version = content_hash(encoded)
+
+    manifest = load_manifest(manifest_path) or {'name': name, 'current': None, 'versions': [], 'deltas': {}}
+    if manifest['current'] and manifest['current']['version'] == version:
+        return manifest, False
+
+    version_file = f"{name}.{version}.json"
+    write_bytes_atomic(os.path.join(output_dir, version_file), encoded)
+    current = {
+        'version': version,
+        'file': version_file,
+        'bytes': len(encoded),
+        'entries': len(content[entries_key(content)]),
+        'published_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    # Direct deltas from each recent version to the new one, so any client is one fetch away
+    previous: List[Dict] = [entry for entry in manifest['versions'] if entry['version'] != version][:keep - 1]
+    deltas = {}
+    for entry in previous:
+        try:
+            with open(os.path.join(output_dir, entry['file']), 'r', encoding='utf-8') as file:
+                old_content = json.load(file)
+        except FileNotFoundError:
+            continue
+        delta = compute_delta(old_content, content)
+        delta_file = f"{name}.{entry['version']}-{version}.delta.json"
+        write_json_atomic(os.path.join(output_dir, delta_file),
+                          {'from': entry['version'], 'to': version, **delta}, indent=None)
+        deltas[entry['version']] = {
+            'file': delta_file,
+            'bytes': os.path.getsize(os.path.join(output_dir, delta_file)),
+            'added': len(delta['added']),
+            'changed': len(delta['changed']),
+            'removed': len(delta['removed'])
+        }
+
+    manifest = {
+        'name': name,
+        'current': current,
+        'versions': [{key: current[key] for key in ('version', 'file', 'published_at')}]
+                    + [entry for entry in previous if entry['version'] in deltas],
+        'deltas': deltas
+    }
+    write_json_atomic(manifest_path, manifest)
+    remove_unreferenced(output_dir, name, manifest, keep_paths=[json_file])
+    return manifest, True
+
+def published_file_pattern(name: str) -> Pattern[str]:
+    """Names of the version and delta files publish_artifacts writes for name"""
+    digest = f"[0-9a-f]{{{HASH_LENGTH}}}"
+    return re.compile(rf"{re.escape(name)}\.(?:{digest}|{digest}-{digest}\.delta)\.json")
+
+def remove_unreferenced(output_dir: str, name: str, manifest: Dict, keep_paths: Iterable[str] = ()):
+    """Delete versions and deltas the manifest no longer lists; nothing else (e.g. the source file) is touched"""
+    referenced = {entry['file'] for entry in manifest['versions']}
+    referenced.update(delta['file'] for delta in manifest['deltas'].values())
+    kept = {os.path.realpath(path) for path in keep_paths}
+    pattern = published_file_pattern(name)
+    for file_name in os.listdir(output_dir):
+        path = os.path.join(output_dir, file_name)
+        if pattern.fullmatch(file_name) and file_name not in referenced and os.path.realpath(path) not in kept:
+            os.remove(path)
+
+def print_publish_summary(manifest: Dict, published: bool, output_dir: str):
+    current = manifest['current']
+    if not published:
+        print(f"📦 {manifest['name']} unchanged (version {current['version']})")
+        return
+    print(f"📦 Published {current['file']} ({current['entries']} entries, {current['bytes'] / 1024:.1f} KB) "
+          f"to {output_dir}/")
+    for version, delta in manifest['deltas'].items():
+        print(f"   delta from {version}: +{delta['added']} ~{delta['changed']} -{delta['removed']} "
+              f"({delta['bytes'] / 1024:.1f} KB)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish content-hashed coordinate artifacts and deltas.')
+    parser.add_argument('json_files', nargs='*', default=['zip_coordinates.json'],
+                        help='coordinate files to publish (zip and/or city)')
+    parser.add_argument('--output-dir', default='dist')
+    parser.add_argument('--keep', type=int, default=5, help='published versions to keep deltas from')
+    args = parser.parse_args()
+
+    for json_file in args.json_files:
+        manifest, published = publish_artifacts(json_file, args.output_dir, max(1, args.keep))
+        print_publish_summary(manifest, published, args.output_dir)
+
+if __name__ == "__main__":
+    main()
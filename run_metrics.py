@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Structured metrics for an update run.
+Timing spans, counters, gauges and a request latency histogram, written as
+a JSON run report and as a Prometheus textfile-collector file.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from checkpoint import write_bytes_atomic, write_json_atomic
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]  # seconds
+
+def latency_histogram(samples: List[float], buckets: List[float] = LATENCY_BUCKETS) -> Dict:
+    """Cumulative bucket counts in the Prometheus style, plus sum and count"""
+    return {
+        'buckets': {f"{bound:g}": sum(1 for sample in samples if sample <= bound) for bound in buckets},
+        'sum': sum(samples),
+        'count': len(samples)
+    }
+
+class RunMetrics:
+    """Everything measured during one run of a job"""
+
+    def __init__(self, job: str = 'update_coordinates'):
+        self.job = job
+        self.started = time.time()
+        self.status = 'ok'
+        self.spans: Dict[str, float] = {}
+        self.counters = Counter()
+        self.gauges: Dict[str, float] = {}
+        self.latency_samples: List[float] = []
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block; repeated spans of the same name add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def report(self) -> Dict:
+        finished = time.time()
+        return {
+            'job': self.job,
+            'status': self.status,
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'duration_seconds': round(finished - self.started, 3),
+            'spans_seconds': {name: round(seconds, 4) for name, seconds in self.spans.items()},
+            'counters': dict(self.counters),
+            'gauges': self.gauges,
+            'request_latency_seconds': latency_histogram(self.latency_samples)
+        }
+
+    def write_json(self, path: str):
+        write_json_atomic(path, self.report())
+
+    def prometheus_text(self) -> str:
+        """Exposition-format text; written atomically so node_exporter never sees half a file"""
+        report = self.report()
+        prefix = metric_name(self.job)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name}{suffix} {value}")
+
+        metric('last_run_timestamp_seconds', 'gauge', 'Unix time the last run finished.',
+               [('', {}, f"{time.time():.0f}")])
+        metric('last_run_success', 'gauge', 'Whether the last run completed (1) or not (0).',
+               [('', {'status': self.status}, int(self.status == 'ok'))])
+        metric('run_duration_seconds', 'gauge', 'Wall time of the last run.',
+               [('', {}, report['duration_seconds'])])
+        metric('stage_duration_seconds', 'gauge', 'Wall time per stage of the last run.',
+               [('', {'stage': name}, seconds) for name, seconds in report['spans_seconds'].items()])
+        for name, value in sorted(self.counters.items()):
+            metric(f"{metric_name(name)}_total", 'counter', f"{name} in the last run.", [('', {}, value)])
+        for name, value in sorted(self.gauges.items()):
+            metric(metric_name(name), 'gauge', f"{name} in the last run.", [('', {}, value)])
+
+        histogram = report['request_latency_seconds']
+        metric('request_latency_seconds', 'histogram', 'Latency of each geocoder request attempt.',
+               [('_bucket', {'le': bound}, count) for bound, count in histogram['buckets'].items()]
+               + [('_bucket', {'le': '+Inf'}, histogram['count']),
+                  ('_sum', {}, f"{histogram['sum']:.6f}"),
+                  ('_count', {}, histogram['count'])])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        write_bytes_atomic(path, self.prometheus_text().encode('utf-8'))
+
+def metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def write_metrics(metrics: RunMetrics, json_path: Optional[str], prometheus_path: Optional[str]):
+    """Write whichever outputs were asked for"""
+    if json_path:
+        metrics.write_json(json_path)
+        print(f"📈 Run report written to {json_path}")
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+        print(f"📈 Prometheus metrics written to {prometheus_path}")
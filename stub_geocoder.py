@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Nominatim search API for offline runs and throughput tests.
+Answers /search?postalcode=..., ?city=...&state=... and ?q=... with
+deterministic fake coordinates.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+def fake_coordinates(query: str) -> Tuple[float, float]:
+    """Deterministic pseudo-coordinates inside the continental US"""
+    digest = hashlib.sha1(query.encode('utf-8')).digest()
+    lat = 25.0 + int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF * 24.0
+    lon = -124.0 + int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF * 57.0
+    return (lat, lon)
+
+def is_stub_miss(query: str, miss_rate: float) -> bool:
+    """Deterministically decide whether a query has no result"""
+    digest = hashlib.sha1(b'miss:' + query.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF < miss_rate
+
+class StubGeocoderServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub's behaviour settings and counters"""
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, max_rps: Optional[float] = None,
+                 miss_rate: float = 0.0, error_rate: float = 0.0, retry_after: int = 1, seed: int = 0):
+        super().__init__(address, StubGeocoderHandler)
+        self.latency = latency
+        self.max_rps = max_rps
+        self.miss_rate = miss_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.recent = deque()
+        self.lock = threading.Lock()
+
+    def over_limit(self) -> bool:
+        """Sliding one-second window check against max_rps"""
+        with self.lock:
+            self.request_count += 1
+            if not self.max_rps:
+                return False
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] >= 1.0:
+                self.recent.popleft()
+            if len(self.recent) >= self.max_rps:
+                self.rate_limited_count += 1
+                return True
+            self.recent.append(now)
+            return False
+
+class StubGeocoderHandler(BaseHTTPRequestHandler):
+    server: StubGeocoderServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/search':
+            self.send_error(404)
+            return
+
+        if self.server.over_limit():
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.error_rate and self.server.random.random() < self.server.error_rate:
+            self.send_error(503)
+            return
+
+        params = parse_qs(url.query)
+        query = (params.get('postalcode') or params.get('q') or [''])[0]
+        if not query and 'city' in params:
+            query = f"{params['city'][0]}, {params.get('state', [''])[0]}"
+        if not query or is_stub_miss(query, self.server.miss_rate):
+            data = []
+        else:
+            lat, lon = fake_coordinates(query)
+            data = [{'lat': f"{lat:.7f}", 'lon': f"{lon:.7f}", 'display_name': f"{query}, United States"}]
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_geocoder(host: str = '127.0.0.1', port: int = 0, **settings) -> Tuple[StubGeocoderServer, str]:
+    """Start the stub in a background thread and return (server, search URL)"""
+    server = StubGeocoderServer((host, port), **settings)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/search"
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local stub geocoder.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before answering')
+    parser.add_argument('--max-rps', type=float, default=None, help='answer 429 above this many requests per second')
+    parser.add_argument('--miss-rate', type=float, default=0.0, help='fraction of queries with no result')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = StubGeocoderServer((args.host, args.port), latency=args.latency, max_rps=args.max_rps,
+                                miss_rate=args.miss_rate, error_rate=args.error_rate)
+    print(f"Stub geocoder listening on http://{args.host}:{args.port}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.request_count} requests ({server.rate_limited_count} rate limited)")
+
+if __name__ == "__main__":
+    main()
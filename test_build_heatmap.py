@@ -0,0 +1,16 @@
+import os
+
+from build_heatmap import build_heatmap
+
+def test_stale_cleanup_only_removes_zoom_files(tmp_path):
+    for file_name in ['zip_coordinates.json', 'zip_coordinates.0123456789abcdef.json', 'z5.json', 'zoom.json']:
+        (tmp_path / file_name).write_text('{}', encoding='utf-8')
+    organizations = [{'latitude': 40.7, 'longitude': -74.0, 'state': 'NY', 'type': 'Shelter'},
+                     {'latitude': None, 'longitude': None, 'state': 'NY', 'type': 'Shelter'}]
+
+    cells = build_heatmap(organizations, str(tmp_path), [3, 4], 32)
+
+    assert cells == {3: 1, 4: 1}
+    assert sorted(os.listdir(tmp_path)) == ['manifest.json', 'z3.json', 'z4.json',
+                                            'zip_coordinates.0123456789abcdef.json', 'zip_coordinates.json',
+                                            'zoom.json']
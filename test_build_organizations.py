@@ -0,0 +1,14 @@
+from build_organizations import attach_coordinates
+
+def organization(zip_code, city='Springfield'):
+    return {'zip': zip_code, 'city': city, 'state': 'IL', 'address': ''}
+
+def test_only_inferred_rows_carry_a_confidence():
+    organizations = [organization('62701'), organization('62799'), organization('00000', 'Chicago')]
+    inferred = {'62799': {'latitude': 39.8, 'longitude': -89.6, 'confidence': 0.75, 'method': 'zip3_city'}}
+
+    sources = attach_coordinates(organizations, {'62701': {'latitude': 39.8, 'longitude': -89.65}},
+                                 {'Chicago, IL': {'latitude': 41.9, 'longitude': -87.6}}, inferred)
+
+    assert sources == {'zip': 1, 'inferred': 1, 'city': 1}
+    assert [org['coordinateConfidence'] for org in organizations] == [None, 0.75, None]
@@ -0,0 +1,39 @@
+from checkpoint import CoordinateJournal, replay_journal
+
+def test_replay_ignores_truncated_last_line(tmp_path):
+    path = tmp_path / 'coordinates.json.journal'
+    journal = CoordinateJournal(str(path))
+    journal.append('10001', {'latitude': 40.75, 'longitude': -73.99})
+    journal.append('99999', error='No coordinates found')
+    journal.append('60601', error='HTTP 503', transient=True)
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"key": "94105", "latit')
+
+    coordinates, failed = replay_journal(str(path))
+    assert coordinates == {'10001': {'latitude': 40.75, 'longitude': -73.99}}
+    assert failed == {'99999'}
+
+def test_entries_appended_after_truncated_line_survive(tmp_path):
+    path = tmp_path / 'coordinates.json.journal'
+    path.write_text('{"key": "10001", "latitude": 40.75, "longitude": -73.99}\n{"key": "94105", "lat',
+                    encoding='utf-8')
+    journal = CoordinateJournal(str(path))
+    journal.append('94105', {'latitude': 37.79, 'longitude': -122.39})
+    journal.close()
+
+    coordinates, failed = replay_journal(str(path))
+    assert coordinates == {'10001': {'latitude': 40.75, 'longitude': -73.99},
+                           '94105': {'latitude': 37.79, 'longitude': -122.39}}
+    assert failed == set()
+
+def test_later_success_clears_failure(tmp_path):
+    path = tmp_path / 'coordinates.json.journal'
+    journal = CoordinateJournal(str(path))
+    journal.append('10001', error='No coordinates found')
+    journal.append('10001', {'latitude': 40.75, 'longitude': -73.99})
+    journal.close()
+    assert replay_journal(str(path)) == ({'10001': {'latitude': 40.75, 'longitude': -73.99}}, set())
+
+def test_missing_journal_replays_nothing(tmp_path):
+    assert replay_journal(str(tmp_path / 'missing.journal')) == ({}, set())
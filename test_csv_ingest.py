@@ -0,0 +1,127 @@
+import csv
+import random
+
+import pytest
+
+import csv_ingest
+from csv_ingest import CsvTail, address_key, iter_columns, normalize_address, parallel_column_sets
+
+COLUMNS = ('zip', 'city', 'state')
+TRICKY_VALUES = ['plain', 'comma, inside', 'say "hi"', 'line one\nline two', 'crlf\r\nline', '"\n"', '', ' padded ']
+
+def write_tricky_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'zip', 'city', 'notes', 'state'])
+        for i in range(rows):
+            writer.writerow([rng.choice(TRICKY_VALUES), f"{rng.randrange(100000):05d}",
+                             rng.choice(TRICKY_VALUES) + str(i % 7), rng.choice(TRICKY_VALUES),
+                             rng.choice(['CA', 'NY', 'IL\nX'])])
+            if i % 97 == 0:
+                writer.writerow(['short row'])
+
+def serial_column_sets(path, columns):
+    return set(iter_columns(path, columns))
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_parallel_matches_serial_on_quoted_multiline_fields(tmp_path, workers):
+    path = str(tmp_path / 'tricky.csv')
+    write_tricky_csv(path, 3000)
+    assert parallel_column_sets([path], COLUMNS, workers) == serial_column_sets(path, COLUMNS)
+
+def test_parallel_matches_serial_with_small_chunks(tmp_path, monkeypatch):
+    # Small reads put chunk and split boundaries inside quoted fields
+    monkeypatch.setattr(csv_ingest, 'FINGERPRINT_BYTES', 64)
+    monkeypatch.setattr(csv_ingest, 'TAIL_CHUNK_BYTES', 256)
+    path = str(tmp_path / 'tricky.csv')
+    write_tricky_csv(path, 500, seed=1)
+    assert parallel_column_sets([path], COLUMNS, 4) == serial_column_sets(path, COLUMNS)
+
+def test_parallel_matches_serial_on_quoted_header(tmp_path):
+    path = tmp_path / 'header.csv'
+    path.write_text('"notes\nmore",zip\n"a\nb",12345\nc,"67890"\n', encoding='utf-8')
+    assert parallel_column_sets([str(path)], ('zip',), 2) == {('12345',), ('67890',)}
+    assert parallel_column_sets([str(path)], ('zip',), 2) == serial_column_sets(str(path), ('zip',))
+
+@pytest.mark.parametrize('address, city, state, expected', [
+    ('10 Unit Rd', 'Austin', 'TX', '10 unit rd, austin, TX'),
+    ('45 Building Way', 'Fresno', 'CA', '45 building way, fresno, CA'),
+    ('200 Ste Genevieve Ave', 'St Louis', 'MO', '200 ste genevieve ave, st louis, MO'),
+    ('123 N. Main Street Suite 200', 'Springfield', 'IL', '123 n main st, springfield, IL'),
+    ('123 Main St, Apt 4B', 'Springfield', 'IL', '123 main st, springfield, IL'),
+    ('123 Main St #4', 'Springfield', 'IL', '123 main st, springfield, IL'),
+    ('First Street', 'Springfield', 'IL', None),
+    ('123', 'Springfield', 'IL', None),
+    ('PO Box 12', 'Springfield', 'IL', None),
+])
+def test_normalize_address(address, city, state, expected):
+    assert normalize_address(address, city, state) == expected
+
+def test_trailing_city_state_zip_dedupes_with_plain_form():
+    plain = normalize_address('123 Main Street', 'Springfield', 'IL', '62701')
+    assert plain == '123 main st, springfield, IL 62701'
+    assert normalize_address('123 Main St, Springfield, IL 62701', 'Springfield', 'IL', '62701') == plain
+    assert normalize_address('123 Main St, Springfield IL 62701-1234', 'Springfield', 'IL', '62701') == plain
+    # Another town in the address is not the row's city, so it stays
+    assert normalize_address('123 Main St, Chatham', 'Springfield', 'IL') == '123 main st chatham, springfield, IL'
+
+def test_address_key_uses_state_code_and_zip_fallbacks():
+    record = {'address': '123 Main St', 'city': 'Springfield', 'state code': 'IL', 'zip code': '62701'}
+    assert address_key(record) == '123 main st, springfield, IL 62701'
+
+def test_tail_reads_only_appended_rows(tmp_path):
+    path = tmp_path / 'orgs.csv'
+    path.write_text('name,zip\nA,10001\n', encoding='utf-8')
+    tail = CsvTail(str(path), str(tmp_path / 'tail.json'))
+    assert tail.poll() == {'10001'}
+    assert tail.poll() is None
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('B,10001\nC,"60601"\n')
+    assert tail.poll() == {'60601'}
+    assert not tail.rescanned
+    # A restarted tail picks up from the saved offset
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('D,94103\n')
+    assert CsvTail(str(path), str(tmp_path / 'tail.json')).poll() == {'94103'}
+
+def test_tail_parses_a_last_row_without_newline_once_it_is_unchanged(tmp_path):
+    path = tmp_path / 'orgs.csv'
+    path.write_text('name,zip\nA,10001\nB,10002', encoding='utf-8')
+    tail = CsvTail(str(path), str(tmp_path / 'tail.json'))
+    assert tail.poll() == {'10001'}
+    assert tail.poll() == {'10002'}
+    assert tail.poll() is None
+    # The row was not finished after all; its newline and the next row arrive later
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('\nC,60601\n')
+    assert tail.poll() == {'60601'}
+    assert tail.zip_codes == {'10001', '10002', '60601'}
+
+def test_tail_waits_for_an_open_quote_in_the_last_row(tmp_path):
+    path = tmp_path / 'orgs.csv'
+    path.write_text('name,zip\nA,10001\n"B\nstill', encoding='utf-8')
+    tail = CsvTail(str(path), str(tmp_path / 'tail.json'))
+    assert tail.poll() == {'10001'}
+    assert tail.poll() == set()
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(' quoted",10002\n')
+    assert tail.poll() == {'10002'}
+
+def test_tail_rescans_a_rewritten_file(tmp_path):
+    path = tmp_path / 'orgs.csv'
+    path.write_text('name,zip\nA,10001\n', encoding='utf-8')
+    tail = CsvTail(str(path), str(tmp_path / 'tail.json'))
+    assert tail.poll() == {'10001'}
+    path.write_text('name,zip\nB,60601\nC,94103\n', encoding='utf-8')
+    assert tail.poll() == {'60601', '94103'}
+    assert tail.rescanned
+    assert tail.zip_codes == {'60601', '94103'}
+
+def test_city_keys_use_state_code_and_zip_fallbacks(tmp_path):
+    path = tmp_path / 'orgs.csv'
+    path.write_text('name,City,State Code,Zip Code\nA,Springfield,IL,bad\nB,Chicago,IL,60601\nC,Peoria,,x\n',
+                    encoding='utf-8')
+    assert csv_ingest.extract_city_keys([str(path)]) == {'Springfield, IL'}
+    assert csv_ingest.extract_city_keys([str(path)], usable_zips=set()) == {'Springfield, IL', 'Chicago, IL'}
+    assert csv_ingest.parallel_extract_city_keys([str(path)], set(), 2) == {'Springfield, IL', 'Chicago, IL'}
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from geocode_providers import FunctionProvider, ProviderChain
+from geocoding import NoResultError
+
+class StubProvider(FunctionProvider):
+    """In-process provider answering after a fixed latency, counting the requests it serves"""
+
+    def __init__(self, name, latency=0.0, rate=None, missing=(), cached=None):
+        super().__init__(name, self.answer, cached=cached, rate=rate)
+        self.latency = latency
+        self.missing = set(missing)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def answer(self, query):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        if query in self.missing:
+            raise NoResultError('No coordinates found')
+        return (1.0, 2.0, self.name)
+
+def test_fast_primary_wins_without_hedging():
+    primary, secondary = StubProvider('primary', 0.01), StubProvider('secondary')
+    chain = ProviderChain([primary, secondary], hedge_after=0.2)
+    assert chain.geocode('10001') == (1.0, 2.0, 'primary')
+    assert chain.hedges == 0
+    assert secondary.requests == 0
+
+def test_slow_primary_is_hedged_and_secondary_wins():
+    primary, secondary = StubProvider('primary', 0.5), StubProvider('secondary', 0.01)
+    chain = ProviderChain([primary, secondary], hedge_after=0.05)
+    assert chain.geocode('10001') == (1.0, 2.0, 'secondary')
+    assert chain.hedges == 1
+    assert chain.wins == {'secondary': 1}
+    assert chain.requests == {'primary': 1, 'secondary': 1}
+
+def test_waiting_for_a_rate_limit_token_is_not_hedged():
+    primary, secondary = StubProvider('primary', 0.01, rate=4), StubProvider('secondary', 0.01)
+    primary.bucket.acquire()  # the next primary token is 0.25s away
+    chain = ProviderChain([primary, secondary], hedge_after=0.05)
+    assert chain.geocode('10001') == (1.0, 2.0, 'primary')
+    assert chain.hedges == 0
+    assert secondary.requests == 0
+
+def test_abandoned_hedge_gives_up_its_token_wait():
+    primary = StubProvider('primary', 0.2)
+    secondary = StubProvider('secondary', 0.01, rate=0.5)
+    secondary.bucket.acquire()  # the next secondary token is 2s away
+    chain = ProviderChain([primary, secondary], hedge_after=0.05)
+    start = time.monotonic()
+    assert chain.geocode('10001') == (1.0, 2.0, 'primary')
+    assert chain.hedges == 1
+    assert time.monotonic() - start < 1.0
+    time.sleep(0.1)
+    assert secondary.requests == 0
+
+def test_requests_that_lost_the_race_do_not_hold_up_hedges():
+    primary, secondary = StubProvider('primary', 1.0), StubProvider('secondary', 0.01)
+    chain = ProviderChain([primary, secondary], hedge_after=0.02)
+
+    def lookups():
+        for i in range(10):
+            assert chain.geocode(f"{10001 + i:05d}") == (1.0, 2.0, 'secondary')
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 40 hedges each about 0.1s; in a pool they would wait for unread 1s primary requests to finish
+    assert time.monotonic() - start < 1.0
+    assert chain.hedges == 40
+
+def test_miss_moves_on_to_the_next_provider():
+    primary, secondary = StubProvider('primary', missing={'10001'}), StubProvider('secondary')
+    for hedge_after in (None, 0.5):
+        chain = ProviderChain([primary, secondary], hedge_after)
+        assert chain.geocode('10001') == (1.0, 2.0, 'secondary')
+        assert chain.requests == {'primary': 1, 'secondary': 1}
+        assert chain.hedges == 0
+
+def test_every_provider_missing_is_no_result():
+    chain = ProviderChain([StubProvider('primary', missing={'10001'}), StubProvider('secondary', missing={'10001'})],
+                          0.5)
+    with pytest.raises(NoResultError):
+        chain.geocode('10001')
+
+def cached_answers(answers):
+    def cached(query):
+        answer = answers.get(query)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    return cached
+
+def test_chain_cache_answers_from_any_provider():
+    primary = StubProvider('primary', cached=cached_answers({'10001': NoResultError('cached')}))
+    secondary = StubProvider('secondary', cached=cached_answers({'10001': (3.0, 4.0, 'cached')}))
+    chain = ProviderChain([primary, secondary])
+    assert chain.cached('10001') == (3.0, 4.0, 'cached')
+    assert chain.cached('60601') is None
+
+def test_chain_cache_miss_needs_every_provider():
+    miss = NoResultError('cached')
+    primary = StubProvider('primary', cached=cached_answers({'10001': miss, '60601': miss}))
+    secondary = StubProvider('secondary', cached=cached_answers({'10001': miss}))
+    chain = ProviderChain([primary, secondary])
+    with pytest.raises(NoResultError):
+        chain.cached('10001')
+    assert chain.cached('60601') is None
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from geocoding import TokenBucket
+
+class FakeClock:
+    """Monotonic clock that only moves when the bucket sleeps"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def bucket(rate, capacity=1):
+    clock = FakeClock()
+    return TokenBucket(rate, capacity, clock=clock, sleep=clock.sleep), clock
+
+def test_requests_are_spaced_by_the_rate():
+    limiter, clock = bucket(2)
+    for _ in range(4):
+        assert limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)] * 3
+    assert clock.now == pytest.approx(101.5)
+
+def test_burst_is_available_up_front():
+    limiter, clock = bucket(1, capacity=3)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+def test_idle_time_refills_up_to_capacity():
+    limiter, clock = bucket(1, capacity=2)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 10
+    for _ in range(2):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+def test_pause_holds_tokens_back():
+    limiter, clock = bucket(4)
+    limiter.pause(3)
+    limiter.acquire()
+    assert clock.now == pytest.approx(103.25)
+
+def test_unlimited_rate_never_waits():
+    limiter, clock = bucket(None)
+    for _ in range(100):
+        assert limiter.acquire()
+    assert clock.sleeps == []
+
+def test_cancelled_acquire_takes_no_token():
+    limiter, clock = bucket(1)
+    cancelled = threading.Event()
+    cancelled.set()
+    assert limiter.acquire(cancelled) is False
+    assert limiter.acquire()
+    assert clock.sleeps == []
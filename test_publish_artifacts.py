@@ -0,0 +1,33 @@
+import json
+import os
+
+from publish_artifacts import publish_artifacts
+
+def write_coordinates(path, coordinates):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'metadata': {'total_zips': len(coordinates)}, 'coordinates': coordinates}, file)
+
+def test_publishing_into_the_source_directory_keeps_the_source(tmp_path):
+    source = tmp_path / 'zip_coordinates.json'
+    neighbours = ['zip_coordinates.json.fingerprint.json', 'zip_coordinates.json.journal',
+                  'zip_coordinates.backup.json', 'zip_coordinates.bin']
+    for file_name in neighbours:
+        (tmp_path / file_name).write_text('{}', encoding='utf-8')
+
+    versions = []
+    for i in range(4):
+        write_coordinates(source, {f"{10001 + j:05d}": {'latitude': 40.0 + j, 'longitude': -74.0}
+                                   for j in range(i + 1)})
+        manifest, published = publish_artifacts(str(source), str(tmp_path), keep=2)
+        assert published
+        versions.append(manifest['current']['file'])
+
+    remaining = set(os.listdir(tmp_path))
+    assert 'zip_coordinates.json' in remaining
+    assert set(neighbours) <= remaining
+    assert 'zip_coordinates.manifest.json' in remaining
+    # Only versions and deltas the manifest still lists are kept
+    assert versions[-1] in remaining and versions[-2] in remaining
+    assert versions[0] not in remaining and versions[1] not in remaining
+    deltas = {name for name in remaining if name.endswith('.delta.json')}
+    assert deltas == {delta['file'] for delta in manifest['deltas'].values()}
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from checkpoint import CoordinateJournal
+from stub_geocoder import fake_coordinates, start_stub_geocoder
+from update_coordinates import UpdateOptions, load_existing_coordinates, recheck_suspects, save_coordinates
+
+@pytest.fixture
+def geocoder_url():
+    server, url = start_stub_geocoder()
+    yield url
+    server.shutdown()
+
+def test_resumed_recheck_keeps_journaled_answers(tmp_path, geocoder_url):
+    json_file = str(tmp_path / 'zip_coordinates.json')
+    suspects_file = tmp_path / 'coordinate_suspects.json'
+    save_coordinates(json_file, {'10001': {'latitude': 1.0, 'longitude': 1.0},
+                                 '10002': {'latitude': 2.0, 'longitude': 2.0}}, [])
+    suspects_file.write_text(json.dumps({'suspects': [{'zip': '10001'}, {'zip': '10002'}]}), encoding='utf-8')
+    # An interrupted recheck answered 10001 but crashed before its checkpoint
+    journal = CoordinateJournal(json_file + '.recheck.journal')
+    journal.append('10001', {'latitude': 40.7, 'longitude': -74.0})
+    journal.close()
+
+    options = UpdateOptions(geocoder_url=geocoder_url, rate=None, cache_file=None, resume=True)
+    recheck_suspects(json_file, str(suspects_file), options)
+
+    coordinates = load_existing_coordinates(json_file)
+    assert coordinates['10001'] == {'latitude': 40.7, 'longitude': -74.0}
+    assert (coordinates['10002']['latitude'], coordinates['10002']['longitude']) == pytest.approx(
+        fake_coordinates('10002'))
+    assert not (tmp_path / 'zip_coordinates.json.recheck.journal').exists()
+
+def test_recheck_journal_blocks_a_run_without_resume(tmp_path, geocoder_url):
+    json_file = str(tmp_path / 'zip_coordinates.json')
+    suspects_file = tmp_path / 'coordinate_suspects.json'
+    save_coordinates(json_file, {'10001': {'latitude': 1.0, 'longitude': 1.0}}, [])
+    suspects_file.write_text(json.dumps({'suspects': [{'zip': '10001'}]}), encoding='utf-8')
+    journal = CoordinateJournal(json_file + '.recheck.journal')
+    journal.append('10001', {'latitude': 40.7, 'longitude': -74.0})
+    journal.close()
+
+    recheck_suspects(json_file, str(suspects_file), UpdateOptions(geocoder_url=geocoder_url, cache_file=None))
+
+    assert load_existing_coordinates(json_file)['10001'] == {'latitude': 1.0, 'longitude': 1.0}
+    assert (tmp_path / 'zip_coordinates.json.recheck.journal').exists()
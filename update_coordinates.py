@@ -4,54 +4,170 @@ Incremental coordinate updater.
 Compares CSV with existing JSON and fetches only new zip codes.
 """
 
-import csv
+import argparse
+import errno
 import json
-import requests
+import os
 import time
-import re
-from typing import Set, Dict, Tuple
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Dict, Tuple, Union
 
-def is_valid_zip(zip_code: str) -> bool:
-    """Check if zip code is valid (5 digits)"""
-    return bool(re.match(r'^\d{5}$', zip_code.strip()))
+from build_spatial_index import haversine_miles
+from checkpoint import CoordinateJournal, InputFingerprints, replay_journal, write_json_atomic
+from coordinate_binary import write_coordinate_binary
+from csv_ingest import (CsvTail, expand_csv_paths, extract_address_keys, extract_city_keys, extract_zip_codes,
+                        iter_new_zip_codes, parallel_extract_city_keys, parallel_extract_zip_codes)
+from geocode_cache import (DAY, DEFAULT_CACHE_FILE, STATUS_ERROR, STATUS_NO_RESULT, STATUS_OK,
+                           GeocodeCache)
+from gazetteer import load_gazetteer, resolve_from_gazetteer
+from geocode_providers import FunctionProvider, ProviderChain
+from publish_artifacts import print_publish_summary, publish_artifacts
+from run_metrics import RunMetrics, write_metrics
+from validate_coordinates import load_suspect_zips
+from geocoding import (GeocodeRun, LatencyRecorder, NoResultError, RateLimitedError, TransientGeocodeError,
+                       create_session, geocode_concurrently, geocode_streaming, get_with_retries)
 
-def get_coordinates_from_zip(zip_code: str) -> Tuple[float, float]:
-    """Get coordinates for a zip code using Nominatim API"""
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+JOURNAL_SUFFIX = ".journal"
+FINGERPRINT_SUFFIX = ".fingerprint.json"
+
+@dataclass
+class UpdateOptions:
+    """Tunables for an update run"""
+    geocoder_url: str = NOMINATIM_URL
+    workers: int = 4
+    rate: Optional[float] = 1.0  # requests per second; Nominatim's usage policy allows 1
+    burst: int = 1
+    cache_file: Optional[str] = DEFAULT_CACHE_FILE
+    cache_ttls: Optional[Dict[str, float]] = None
+    checkpoint_every: int = 100  # results between atomic rewrites of the JSON
+    resume: bool = False
+    gazetteer_file: Optional[str] = None
+    offline: bool = False  # with a gazetteer, never fall back to the network
+    binary_file: Optional[str] = None
+    max_attempts: int = 3  # per request, for timeouts, connection errors and 5xx answers
+    secondary_geocoder_url: Optional[str] = None  # asked when the primary has no answer or fails
+    secondary_rate: Optional[float] = 1.0
+    hedge_after: Optional[float] = None  # seconds before also asking the secondary
+    publish_dir: Optional[str] = None  # where to publish content-hashed versions and deltas
+    metrics: Optional[RunMetrics] = None  # filled in during the run when given
+    ingest_workers: int = 1  # processes parsing the CSV in byte ranges
+    force: bool = False  # run even when the CSV and coordinate files match the last run's fingerprints
+    prune: bool = False  # drop coordinates no CSV row references
+    queue_size: Optional[int] = None  # keys/results buffered between streaming stages (default: 4 per worker)
+
+def zip_query(zip_code: str) -> Dict[str, str]:
+    return {'postalcode': zip_code, 'country': 'US'}
+
+def city_query(city_key: str) -> Dict[str, str]:
+    city, _, state = city_key.rpartition(', ')
+    return {'city': city, 'state': state, 'country': 'US'}
+
+def address_query(address_key: str) -> Dict[str, str]:
+    """Free-form query for a normalized street address"""
+    return {'q': address_key, 'countrycodes': 'us'}
+
+def fetch_coordinates(query: str, base_url: str = NOMINATIM_URL, session=None,
+                      latency: Optional[LatencyRecorder] = None, max_attempts: int = 3, *,
+                      build_params: Callable[[str], Dict[str, str]]) -> Tuple[float, float, str]:
+    """Ask the Nominatim API for the coordinates and display name of a query.
+
+    build_params turns the query into search parameters (zip_query,
+    city_query, address_query). Raises NoResultError when the geocoder has
+    no answer and TransientGeocodeError when it could not be asked (try
+    again later). Without a shared session, a one-off session is opened and
+    closed around the request.
+    """
+    if session is None:
+        with create_session(1) as session:
+            return fetch_coordinates(query, base_url, session, latency, max_attempts, build_params=build_params)
+    params = {**build_params(query), 'format': 'json', 'limit': 1}
+    
+    response = get_with_retries(session, base_url, params, timeout=10, max_attempts=max_attempts, latency=latency)
+    if response.status_code >= 400:
+        raise TransientGeocodeError(f"HTTP {response.status_code}")
+    
+    data = response.json()
+    
+    if data and len(data) > 0 and 'lat' in data[0] and 'lon' in data[0]:
+        return (float(data[0]['lat']), float(data[0]['lon']), data[0].get('display_name', ''))
+    
+    raise NoResultError('No coordinates found')
+
+def lookup_cached(query: str, base_url: str, cache: GeocodeCache) -> Optional[tuple]:
+    """Return cached (lat, lon, detail), raise for a cached miss or error, or None if not cached"""
+    entry = cache.get(base_url, query)
+    if entry is None:
+        return None
+    if entry.status == STATUS_OK:
+        return (entry.latitude, entry.longitude, entry.detail)
+    if entry.status == STATUS_NO_RESULT:
+        raise NoResultError('No coordinates found (cached)')
+    raise TransientGeocodeError(f"{entry.detail} (cached)")
+
+def record_in_cache(query: str, base_url: str, cache: GeocodeCache, fetch: Callable[[], tuple]) -> tuple:
+    """Run a geocoder call and store its outcome; a third result value is kept as the detail"""
     try:
-        url = f"https://nominatim.openstreetmap.org/search?postalcode={zip_code}&country=US&format=json&limit=1"
-        headers = {'User-Agent': 'OrganizationSearch/1.0'}
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data and len(data) > 0 and 'lat' in data[0] and 'lon' in data[0]:
-            return (float(data[0]['lat']), float(data[0]['lon']))
-        
-        raise Exception('No coordinates found')
-        
+        result = fetch()
+    except NoResultError:
+        cache.put(base_url, query, STATUS_NO_RESULT)
+        raise
+    except RateLimitedError:
+        raise
     except Exception as e:
-        print(f"Error getting coordinates for {zip_code}: {e}")
+        cache.put(base_url, query, STATUS_ERROR, detail=str(e))
         raise
+    cache.put(base_url, query, STATUS_OK, result[:2], detail=result[2] if len(result) > 2 else '')
+    return result
 
-def extract_zip_codes_from_csv(csv_file: str) -> Set[str]:
-    """Extract all unique valid zip codes from CSV"""
-    unique_zips = set()
+def get_coordinates(query: str, base_url: str = NOMINATIM_URL, cache: Optional[GeocodeCache] = None,
+                    use_cached: bool = True, session=None, latency: Optional[LatencyRecorder] = None,
+                    max_attempts: int = 3, *, build_params: Callable[[str], Dict[str, str]]) -> Tuple[float, float, str]:
+    """fetch_coordinates, answering from and recording into the cache"""
+    fetch = lambda: fetch_coordinates(query, base_url, session, latency, max_attempts, build_params=build_params)
+    if cache is None:
+        return fetch()
     
-    print(f"Reading CSV file: {csv_file}")
+    if use_cached:
+        cached = lookup_cached(query, base_url, cache)
+        if cached is not None:
+            return cached
     
-    with open(csv_file, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for row in reader:
-            zip_code = row.get('zip', '').strip()
-            if zip_code and is_valid_zip(zip_code):
-                unique_zips.add(zip_code)
+    return record_in_cache(query, base_url, cache, fetch)
+
+get_coordinates_from_zip = partial(get_coordinates, build_params=zip_query)
+get_coordinates_from_city = partial(get_coordinates, build_params=city_query)
+get_coordinates_from_address = partial(get_coordinates, build_params=address_query)
+
+def extract_zip_codes_from_csv(csv_file: Union[str, List[str]], workers: int = 1) -> Set[str]:
+    """Extract all unique valid zip codes from one or more CSV files (globs, .gz and .bz2 allowed)"""
+    paths = expand_csv_paths(csv_file)
+    
+    print(f"Reading CSV file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}"
+          + (f" ({workers} processes)" if workers > 1 else ""))
+    
+    unique_zips = parallel_extract_zip_codes(paths, workers) if workers > 1 else extract_zip_codes(paths)
     
     print(f"Found {len(unique_zips)} unique valid zip codes in CSV")
     return unique_zips
 
+def extract_city_keys_from_csv(csv_file: Union[str, List[str]], usable_zips: Optional[Set[str]] = None,
+                               workers: int = 1) -> Set[str]:
+    """Extract the "City, ST" keys of rows whose zip code has no coordinates"""
+    paths = expand_csv_paths(csv_file)
+    
+    print(f"Reading CSV file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}"
+          + (f" ({workers} processes)" if workers > 1 else ""))
+    
+    if workers > 1:
+        city_keys = parallel_extract_city_keys(paths, usable_zips, workers)
+    else:
+        city_keys = extract_city_keys(paths, usable_zips)
+    
+    print(f"Found {len(city_keys)} unique cities without a usable zip code in CSV")
+    return city_keys
+
 def load_existing_coordinates(json_file: str) -> Dict[str, Dict[str, float]]:
     """Load existing coordinates from JSON file"""
     try:
@@ -65,8 +181,17 @@ def load_existing_coordinates(json_file: str) -> Dict[str, Dict[str, float]]:
         print(f"Error loading JSON file: {e}")
         return {}
 
-def save_coordinates(json_file: str, coordinates: Dict[str, Dict[str, float]], failed_zips: list):
-    """Save coordinates to JSON file"""
+def load_failed_zips(json_file: str) -> Set[str]:
+    """Load the zip codes previous runs could not geocode"""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as file:
+            return set(json.load(file).get('failed_zips', []))
+    except (OSError, ValueError):
+        return set()
+
+def save_coordinates(json_file: str, coordinates: Dict[str, Dict[str, float]], failed_zips: list,
+                     binary_file: Optional[str] = None):
+    """Save coordinates to JSON file (and the compact binary artifact, if given)"""
     result = {
         'metadata': {
             'total_zips': len(coordinates),
@@ -78,29 +203,366 @@ def save_coordinates(json_file: str, coordinates: Dict[str, Dict[str, float]], f
         'failed_zips': failed_zips
     }
     
-    with open(json_file, 'w', encoding='utf-8') as file:
-        json.dump(result, file, indent=2, ensure_ascii=False)
+    write_json_atomic(json_file, result)
+    if binary_file:
+        write_coordinate_binary(binary_file, coordinates, len(failed_zips))
     
-    print(f"Saved {len(coordinates)} coordinates to {json_file}")
+    print(f"Saved {len(coordinates)} coordinates to {json_file}{f' and {binary_file}' if binary_file else ''}")
+
+def load_existing_city_coordinates(city_json: str) -> Tuple[Dict[str, Dict], Set[str]]:
+    """Load existing city coordinates and the cities previous runs could not geocode"""
+    try:
+        with open(city_json, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+            return data.get('city_coordinates', {}), set(data.get('failed_cities', []))
+    except FileNotFoundError:
+        print(f"JSON file {city_json} not found. Starting fresh.")
+        return {}, set()
+
+def save_city_coordinates(city_json: str, city_coordinates: Dict[str, Dict], failed_cities: list):
+    """Save city coordinates in the format loadCoordinatesFromJSON reads"""
+    result = {
+        'metadata': {
+            'total_cities': len(city_coordinates) + len(failed_cities),
+            'successful': len(city_coordinates),
+            'failed': len(failed_cities),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Coordinates for cities with missing zip codes'
+        },
+        'city_coordinates': dict(sorted(city_coordinates.items())),
+        'failed_cities': failed_cities
+    }
+    
+    write_json_atomic(city_json, result)
+    
+    print(f"Saved {len(city_coordinates)} city coordinates to {city_json}")
+
+def load_existing_address_coordinates(address_json: str) -> Tuple[Dict[str, Dict], Set[str]]:
+    """Load address coordinates (stored as [lat, lon] pairs) and the addresses that could not be geocoded"""
+    try:
+        with open(address_json, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        print(f"JSON file {address_json} not found. Starting fresh.")
+        return {}, set()
+    addresses = {key: {'latitude': lat, 'longitude': lon} for key, (lat, lon) in data.get('addresses', {}).items()}
+    return addresses, set(data.get('failed_addresses', []))
+
+def save_address_coordinates(address_json: str, addresses: Dict[str, Dict], failed_addresses: list):
+    """Save address coordinates compactly: normalized address -> [lat, lon]"""
+    result = {
+        'metadata': {
+            'total_addresses': len(addresses),
+            'failed_addresses': len(failed_addresses),
+            'last_updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Keys are csv_ingest.normalize_address(address, city, state, zip)'
+        },
+        'fields': ['latitude', 'longitude'],
+        'addresses': {key: [round(entry['latitude'], 6), round(entry['longitude'], 6)]
+                      for key, entry in sorted(addresses.items())},
+        'failed_addresses': failed_addresses
+    }
+    
+    write_json_atomic(address_json, result, indent=None)
+    
+    print(f"Saved {len(addresses)} address coordinates to {address_json}")
+
+@dataclass
+class PendingResults:
+    """What a geocoding pass has produced so far"""
+    found: Dict[str, Dict] = field(default_factory=dict)
+    failed: List[str] = field(default_factory=list)
+    retry_later: List[str] = field(default_factory=list)
+
+def replay_interrupted_run(journal_file: str, options: UpdateOptions) -> Optional[Tuple[Dict[str, Dict], Set[str]]]:
+    """Replay the journal of an interrupted run, or return None if the run must not start"""
+    if not os.path.exists(journal_file):
+        return {}, set()
+    if not options.resume:
+        print(f"⚠️  Found {journal_file} from an interrupted run.")
+        print("Rerun with --resume to continue it, or delete the journal to start over.")
+        return None
+    replayed, failed = replay_journal(journal_file)
+    print(f"♻️  Resuming: replayed {len(replayed)} results and {len(failed)} failures from journal")
+    return replayed, failed
+
+def build_provider_chain(get_coordinates: Callable, options: UpdateOptions, session,
+                         latency: LatencyRecorder, cache: Optional[GeocodeCache],
+                         refresh: bool = False) -> ProviderChain:
+    """Primary then secondary geocoder, each with its own rate limit and cache entries"""
+    def provider(name, base_url, rate):
+        return FunctionProvider(
+            name,
+            lambda query: get_coordinates(query, base_url, cache, use_cached=False, session=session,
+                                          latency=latency, max_attempts=options.max_attempts),
+            cached=(lambda query: lookup_cached(query, base_url, cache)) if cache and not refresh else None,
+            rate=rate,
+            burst=options.burst
+        )
+    
+    providers = [provider('primary', options.geocoder_url, options.rate),
+                 provider('secondary', options.secondary_geocoder_url, options.secondary_rate)]
+    return ProviderChain(providers, options.hedge_after)
+
+def geocode_pending(keys: Union[Set[str], Iterable[str]], get_coordinates: Callable, make_entry: Callable[[tuple], Dict],
+                    journal: CoordinateJournal, results: PendingResults, options: UpdateOptions,
+                    checkpoint: Callable[[], None], label: str = 'zip codes',
+                    refresh: bool = False) -> Optional[Tuple[GeocodeRun, LatencyRecorder]]:
+    """Geocode keys concurrently, journaling each result and checkpointing periodically.
+
+    get_coordinates is get_coordinates_from_zip or get_coordinates_from_city;
+    make_entry turns its result into a coordinate entry. With a secondary
+    geocoder configured, keys go through a provider chain that paces each
+    geocoder separately. refresh skips cached answers (fresh answers are
+    still recorded). keys that are not a set are streamed: geocoding starts
+    with the first key produced, over bounded queues. Returns None if the
+    run was interrupted.
+    """
+    completed = 0
+    first_result_at = None
+    metrics = options.metrics or RunMetrics()
+    streaming = not isinstance(keys, (set, frozenset))
+    
+    def progress():
+        return str(completed) if streaming else f"{completed}/{len(keys)}"
+    
+    def report(key, entry, error):
+        nonlocal completed, first_result_at
+        completed += 1
+        first_result_at = first_result_at or time.time()
+        if error is None:
+            results.found[key] = entry
+            journal.append(key, entry)
+            metrics.count('geocode_ok')
+            print(f"Processed {progress()}: {key} [OK] ({entry['latitude']:.4f}, {entry['longitude']:.4f})")
+        elif isinstance(error, NoResultError):
+            results.failed.append(key)
+            journal.append(key, error=str(error))
+            metrics.count('geocode_no_result')
+            print(f"Processed {progress()}: {key} [FAILED] {error}")
+        else:
+            results.retry_later.append(key)
+            journal.append(key, error=str(error), transient=True)
+            metrics.count('geocode_retry_later')
+            print(f"Processed {progress()}: {key} [RETRY LATER] {error}")
+        if options.checkpoint_every and completed % options.checkpoint_every == 0:
+            checkpoint()
+    
+    if streaming:
+        print(f"\nStreaming new {label} to the geocoder as they are read "
+              f"({options.workers} workers, {options.rate or 'unlimited'} req/s, "
+              f"queues of {options.queue_size or 4 * options.workers})...")
+    elif keys:
+        print(f"\nFetching coordinates for {len(keys)} new {label} "
+              f"({options.workers} workers, {options.rate or 'unlimited'} req/s)...")
+    
+    cache = GeocodeCache(options.cache_file, options.cache_ttls) if options.cache_file and keys else None
+    session = create_session(2 * options.workers if options.secondary_geocoder_url else options.workers)
+    latency = LatencyRecorder()
+    chain = None
+    if options.secondary_geocoder_url:
+        chain = build_provider_chain(get_coordinates, options, session, latency, cache, refresh)
+        rate = None
+        
+        def fetch(key):
+            return make_entry(chain.geocode(key))
+        
+        def lookup(key):
+            cached = chain.cached(key)
+            return make_entry(cached) if cached else None
+        
+        print(f"Falling back to {options.secondary_geocoder_url} ({options.secondary_rate or 'unlimited'} req/s)"
+              + (f", hedging after {options.hedge_after}s" if options.hedge_after is not None else ""))
+    else:
+        def fetch(key):
+            return make_entry(get_coordinates(key, options.geocoder_url, cache, use_cached=False, session=session,
+                                              latency=latency, max_attempts=options.max_attempts))
+        
+        def lookup(key):
+            cached = lookup_cached(key, options.geocoder_url, cache)
+            return make_entry(cached) if cached else None
+        
+        rate = options.rate
+    try:
+        if streaming:
+            run = geocode_streaming(keys, fetch, workers=options.workers, rate=rate, burst=options.burst,
+                                    on_result=report, lookup=lookup if cache and not refresh else None,
+                                    queue_size=options.queue_size)
+        else:
+            run = geocode_concurrently(
+                sorted(keys),
+                fetch,
+                workers=options.workers,
+                rate=rate,
+                burst=options.burst,
+                on_result=report,
+                lookup=lookup if cache and not refresh else None
+            )
+    except KeyboardInterrupt:
+        checkpoint()
+        journal.close()
+        metrics.status = 'interrupted'
+        print(f"\n⚠️  Interrupted after {progress()} {label}. Rerun with --resume to continue.")
+        return None
+    finally:
+        session.close()
+        if cache:
+            cache.close()
+    
+    record_run_metrics(metrics, run, latency, completed, chain)
+    print(f"⏱️  {run.requests} requests in {run.elapsed:.1f}s ({run.requests_per_second:.2f} req/s, "
+          f"{run.rate_limited} rate limited)")
+    if first_result_at:
+        # From the start of the run, so time spent reading the CSV first counts
+        metrics.gauge('time_to_first_result_seconds', round(first_result_at - metrics.started, 4))
+        print(f"⏱️  First result {first_result_at - metrics.started:.2f}s into the run")
+    print(f"⏱️  Request latency: {latency.summary()}")
+    if chain:
+        print(f"🔀 Provider chain: {chain.summary()}")
+    if cache:
+        print(f"🗃️  Answered from cache: {run.cached} ({options.cache_file})")
+    return run, latency
+
+def record_run_metrics(metrics: RunMetrics, run: GeocodeRun, latency: LatencyRecorder, lookups: int,
+                       chain: Optional[ProviderChain] = None):
+    """Request, retry and cache counters plus throughput gauges for a geocoding pass"""
+    attempts = len(latency.samples)
+    # Through a provider chain one lookup can send a request to each provider (fallback or hedge)
+    requests = sum(chain.requests.values()) if chain else run.requests
+    metrics.latency_samples.extend(latency.samples)
+    metrics.count('geocode_lookups', lookups)
+    metrics.count('geocoder_requests', requests)
+    metrics.count('geocoder_attempts', attempts)
+    metrics.count('geocoder_retries', max(0, attempts - requests))
+    if chain:
+        metrics.count('geocoder_hedges', chain.hedges)
+    metrics.count('geocoder_rate_limited', run.rate_limited)
+    metrics.count('cache_hits', run.cached)
+    metrics.gauge('cache_hit_ratio', round(run.cached / lookups, 4) if lookups else 0.0)
+    metrics.gauge('geocoder_requests_per_second', round(requests / run.elapsed if run.elapsed > 0 else 0.0, 3))
+    metrics.gauge('request_latency_p50_seconds', round(latency.percentile(0.5), 4))
+    metrics.gauge('request_latency_p95_seconds', round(latency.percentile(0.95), 4))
+
+def publish(json_file: str, options: UpdateOptions):
+    """Publish the saved file as a content-hashed version, if asked to"""
+    if options.publish_dir:
+        manifest, published = publish_artifacts(json_file, options.publish_dir)
+        print_publish_summary(manifest, published, options.publish_dir)
+
+def input_fingerprints(output_file: str, csv_file: Union[str, List[str]], files: List[str],
+                       options: UpdateOptions) -> InputFingerprints:
+    """Fingerprints of everything a run producing output_file reads or writes, plus the options that matter"""
+    files = expand_csv_paths(csv_file) + [path for path in files if path]
+    if options.publish_dir:
+        name = os.path.splitext(os.path.basename(output_file))[0]
+        files.append(os.path.join(options.publish_dir, f"{name}.manifest.json"))
+    settings = {
+        'geocoder_url': options.geocoder_url,
+        'secondary_geocoder_url': options.secondary_geocoder_url,
+        'gazetteer_file': options.gazetteer_file,
+        'prune': options.prune
+    }
+    return InputFingerprints(output_file + FINGERPRINT_SUFFIX, files, settings)
+
+def skip_unchanged(fingerprints: InputFingerprints, journal_file: str, options: UpdateOptions,
+                   metrics: RunMetrics) -> bool:
+    """Whether the last complete run saw exactly these files (an unfinished journal always means no)"""
+    if options.force or os.path.exists(journal_file):
+        return False
+    with metrics.span('fingerprint'):
+        unchanged = fingerprints.unchanged()
+    if unchanged:
+        metrics.count('unchanged_skips')
+        print("✅ Inputs unchanged since the last complete run. No update needed (--force to run anyway).")
+    return unchanged
+
+def prune_unreferenced(entries: Dict[str, Dict], referenced: Set[str], files: List[str],
+                       save: Callable[[Dict[str, Dict]], None], label: str, metrics: RunMetrics):
+    """Drop entries no CSV row references, save right away and report the bytes that saved"""
+    stale = set(entries) - referenced
+    if not stale:
+        print(f"✂️  Nothing to prune: the CSV references all stored {label}")
+        return
+    files = [path for path in files if path]
+    before = sum(os.path.getsize(path) for path in files if os.path.exists(path))
+    for key in stale:
+        del entries[key]
+    save(entries)
+    after = sum(os.path.getsize(path) for path in files if os.path.exists(path))
+    metrics.count('pruned_entries', len(stale))
+    metrics.gauge('pruned_bytes', before - after)
+    print(f"✂️  Pruned {len(stale)} {label} no CSV row references: {before:,} -> {after:,} bytes "
+          f"({before - after:,} saved)")
+
+def coordinate_entry(result: tuple) -> Dict[str, float]:
+    return {'latitude': result[0], 'longitude': result[1]}
+
+def city_entry(result: tuple) -> Dict:
+    return {'latitude': result[0], 'longitude': result[1], 'display_name': result[2]}
 
-def update_coordinates(csv_file: str, json_file: str):
-    """Update coordinates incrementally"""
+def update_coordinates(csv_file: Union[str, List[str]], json_file: str, options: Optional[UpdateOptions] = None,
+                       csv_zips: Optional[Set[str]] = None):
+    """Update coordinates incrementally (csv_zips, when given, are the CSV's zip codes already read)"""
+    options = options or UpdateOptions()
+    metrics = options.metrics or RunMetrics()
     print("=== Incremental Coordinate Update ===")
+    journal_file = json_file + JOURNAL_SUFFIX
+    
+    # A caller passing csv_zips tracks changes to the CSV itself
+    fingerprints = None
+    if csv_zips is None:
+        fingerprints = input_fingerprints(json_file, csv_file, [json_file, options.binary_file], options)
+        if skip_unchanged(fingerprints, journal_file, options, metrics):
+            return
     
     # Extract zip codes from CSV
-    csv_zips = extract_zip_codes_from_csv(csv_file)
+    if csv_zips is None:
+        with metrics.span('csv_read'):
+            csv_zips = extract_zip_codes_from_csv(csv_file, options.ingest_workers)
+    metrics.gauge('csv_unique_zips', len(csv_zips))
     
     # Load existing coordinates
-    existing_coords = load_existing_coordinates(json_file)
-    existing_zips = set(existing_coords.keys())
+    with metrics.span('load_existing'):
+        existing_coords = load_existing_coordinates(json_file)
+        existing_zips = set(existing_coords.keys())
+        previous_failed = load_failed_zips(json_file)
     
     print(f"Existing coordinates: {len(existing_zips)} zip codes")
     
+    # Pick up where an interrupted run left off
+    replayed = replay_interrupted_run(journal_file, options)
+    if replayed is None:
+        metrics.status = 'blocked'
+        return
+    existing_coords.update(replayed[0])
+    replayed_failed = replayed[1]
+    
+    if options.prune:
+        with metrics.span('prune'):
+            prune_unreferenced(existing_coords, csv_zips, [json_file, options.binary_file],
+                               lambda kept: save_coordinates(json_file, kept, sorted(previous_failed & csv_zips),
+                                                             options.binary_file),
+                               'zip codes', metrics)
+    existing_zips = set(existing_coords.keys())
+    
     # Find new zip codes
-    new_zips = csv_zips - existing_zips
+    with metrics.span('diff'):
+        new_zips = csv_zips - existing_zips - replayed_failed
+    metrics.gauge('new_zips', len(new_zips))
     
     if not new_zips:
+        with metrics.span('write'):
+            if os.path.exists(journal_file):
+                finish_failed = sorted((replayed_failed | (previous_failed & csv_zips)) - existing_zips)
+                save_coordinates(json_file, existing_coords, finish_failed, options.binary_file)
+                os.remove(journal_file)
+            elif options.binary_file and not os.path.exists(options.binary_file):
+                write_coordinate_binary(options.binary_file, existing_coords, len(previous_failed))
         print("✅ No new zip codes found. No update needed.")
+        publish(json_file, options)
+        if fingerprints:
+            fingerprints.record()
+        metrics.gauge('total_coordinates', len(existing_coords))
         return
     
     print(f"🆕 Found {len(new_zips)} new zip codes to process:")
@@ -108,55 +570,528 @@ def update_coordinates(csv_file: str, json_file: str):
         print(f"   - {zip_code}")
     
     # Fetch coordinates for new zip codes
-    new_coordinates = {}
-    failed_zips = []
+    results = PendingResults(failed=list(replayed_failed))
+    journal = CoordinateJournal(journal_file)
     
-    print(f"\nFetching coordinates for {len(new_zips)} new zip codes...")
+    def merged_failures():
+        # Keep earlier failures that are still referenced but were not looked up again
+        all_zips = existing_zips | set(results.found)
+        carried_over = (previous_failed & csv_zips) - network_zips
+        return sorted((set(results.failed) | carried_over) - all_zips)
     
-    for i, zip_code in enumerate(sorted(new_zips), 1):
-        print(f"Processing {i}/{len(new_zips)}: {zip_code}", end=" ")
-        
-        try:
-            coords = get_coordinates_from_zip(zip_code)
-            new_coordinates[zip_code] = {
-                'latitude': coords[0],
-                'longitude': coords[1]
-            }
-            print(f"[OK] ({coords[0]:.4f}, {coords[1]:.4f})")
-        except Exception as e:
-            failed_zips.append(zip_code)
-            print("[FAILED]")
-        
-        # Be respectful to the API
-        time.sleep(1)
+    def checkpoint():
+        journal.sync()
+        save_coordinates(json_file, {**existing_coords, **results.found}, merged_failures())
+    
+    # Resolve what a local gazetteer covers before touching the network
+    network_zips = new_zips
+    if options.gazetteer_file:
+        with metrics.span('gazetteer'):
+            found, network_zips = resolve_from_gazetteer(new_zips, load_gazetteer(options.gazetteer_file))
+            for zip_code in sorted(found):
+                journal.append(zip_code, found[zip_code])
+            results.found.update(found)
+        metrics.count('gazetteer_resolved', len(found))
+        print(f"\n📚 Gazetteer {options.gazetteer_file}: resolved {len(found)}/{len(new_zips)} new zip codes")
+    deferred = options.offline and bool(network_zips)
+    if deferred:
+        print(f"📴 Offline: leaving {len(network_zips)} zip codes the gazetteer does not cover for a later run")
+        network_zips = set()
+    
+    with metrics.span('geocode'):
+        outcome = geocode_pending(network_zips, get_coordinates_from_zip, coordinate_entry, journal, results,
+                                  options, checkpoint)
+    if outcome is None:
+        return
     
     # Merge with existing coordinates
-    all_coordinates = {**existing_coords, **new_coordinates}
+    all_coordinates = {**existing_coords, **results.found}
+    failed_zips = merged_failures()
     
-    # Save updated coordinates
-    save_coordinates(json_file, all_coordinates, failed_zips)
+    # Save updated coordinates, then drop the journal they now include
+    with metrics.span('write'):
+        save_coordinates(json_file, all_coordinates, failed_zips, options.binary_file)
+        journal.remove()
+        publish(json_file, options)
+        # Work left for a later run means the same inputs must not be skipped next time
+        if fingerprints and not results.retry_later and not deferred:
+            fingerprints.record()
+        elif fingerprints:
+            fingerprints.clear()
+    metrics.gauge('total_coordinates', len(all_coordinates))
+    metrics.gauge('failed_zips', len(failed_zips))
     
     print(f"\n=== Update Complete ===")
-    print(f"✅ Successfully processed: {len(new_coordinates)}/{len(new_zips)}")
-    print(f"❌ Failed: {len(failed_zips)}")
+    print(f"✅ Successfully processed: {len(results.found)}/{len(new_zips)}")
+    print(f"❌ Failed (no result): {len(failed_zips)}")
+    print(f"🔁 Try again later: {len(results.retry_later)}")
     print(f"📊 Total coordinates: {len(all_coordinates)}")
     
     if failed_zips:
         print(f"\nFailed zip codes:")
         for zip_code in failed_zips:
             print(f"   - {zip_code}")
+    if results.retry_later:
+        print(f"\nZip codes to try again later:")
+        for zip_code in sorted(results.retry_later):
+            print(f"   - {zip_code}")
+
+def stream_coordinates(csv_file: Union[str, List[str]], json_file: str, options: Optional[UpdateOptions] = None):
+    """Update coordinates with reading, geocoding and writing overlapped.
+
+    Each new zip code goes to the geocoder as soon as the reader first sees
+    it, and results are journaled and checkpointed as they complete, so the
+    first result doesn't wait for the whole CSV. Bounded queues between the
+    stages keep memory flat however large the input is.
+    """
+    options = options or UpdateOptions()
+    metrics = options.metrics or RunMetrics()
+    print("=== Streaming Coordinate Update ===")
+    journal_file = json_file + JOURNAL_SUFFIX
+    fingerprints = input_fingerprints(json_file, csv_file, [json_file, options.binary_file], options)
+    if skip_unchanged(fingerprints, journal_file, options, metrics):
+        return
+    
+    # The reader runs on another thread; fail here rather than midway through the pipeline
+    paths = expand_csv_paths(csv_file)
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    print(f"Streaming CSV file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}")
+    
+    with metrics.span('load_existing'):
+        existing_coords = load_existing_coordinates(json_file)
+        previous_failed = load_failed_zips(json_file)
+    print(f"Existing coordinates: {len(existing_coords)} zip codes")
+    
+    replayed = replay_interrupted_run(journal_file, options)
+    if replayed is None:
+        metrics.status = 'blocked'
+        return
+    existing_coords.update(replayed[0])
+    replayed_failed = replayed[1]
+    known = set(existing_coords) | replayed_failed
+    centroids = load_gazetteer(options.gazetteer_file) if options.gazetteer_file else {}
+    
+    # Filled in by the reader thread; only read once the pipeline has drained
+    csv_zips = set()
+    from_gazetteer = {}
+    
+    def new_zip_codes() -> Iterator[str]:
+        for zip_code in iter_new_zip_codes(paths, csv_zips):
+            if zip_code in known:
+                continue
+            if zip_code in centroids:
+                from_gazetteer[zip_code] = coordinate_entry(centroids[zip_code])
+                continue
+            yield zip_code
+    
+    results = PendingResults(failed=list(replayed_failed))
+    journal = CoordinateJournal(journal_file)
+    
+    def failures(coordinates):
+        return sorted(set(results.failed) - set(coordinates))
+    
+    def checkpoint():
+        journal.sync()
+        found = {**existing_coords, **results.found}
+        # Earlier failures can't be checked against the CSV until the reader is done; keep them until then
+        save_coordinates(json_file, found, sorted((set(results.failed) | previous_failed) - set(found)))
+    
+    with metrics.span('stream'):
+        outcome = geocode_pending(new_zip_codes(), get_coordinates_from_zip, coordinate_entry, journal, results,
+                                  options, checkpoint)
+    if outcome is None:
+        return
+    metrics.gauge('csv_unique_zips', len(csv_zips))
+    if from_gazetteer:
+        for zip_code in sorted(from_gazetteer):
+            journal.append(zip_code, from_gazetteer[zip_code])
+        metrics.count('gazetteer_resolved', len(from_gazetteer))
+        print(f"📚 Gazetteer {options.gazetteer_file}: resolved {len(from_gazetteer)} new zip codes")
+    
+    all_coordinates = {**existing_coords, **from_gazetteer, **results.found}
+    failed_zips = failures(all_coordinates)
+    with metrics.span('write'):
+        save_coordinates(json_file, all_coordinates, failed_zips, options.binary_file)
+        journal.remove()
+        if options.prune:
+            prune_unreferenced(all_coordinates, csv_zips, [json_file, options.binary_file],
+                               lambda kept: save_coordinates(json_file, kept, failed_zips, options.binary_file),
+                               'zip codes', metrics)
+        publish(json_file, options)
+        if results.retry_later:
+            fingerprints.clear()
+        else:
+            fingerprints.record()
+    metrics.gauge('total_coordinates', len(all_coordinates))
+    metrics.gauge('failed_zips', len(failed_zips))
+    
+    print(f"\n=== Streaming Update Complete ===")
+    print(f"✅ Successfully processed: {len(results.found) + len(from_gazetteer)}")
+    print(f"❌ Failed (no result): {len(failed_zips)}")
+    print(f"🔁 Try again later: {len(results.retry_later)}")
+    print(f"📊 Total coordinates: {len(all_coordinates)}")
+    if results.retry_later:
+        print(f"\nZip codes to try again later:")
+        for zip_code in sorted(results.retry_later):
+            print(f"   - {zip_code}")
+
+def watch_coordinates(csv_file: str, json_file: str, options: UpdateOptions, state_file: str,
+                      interval: float = 2.0, metrics_json: Optional[str] = None, metrics_prom: Optional[str] = None):
+    """Geocode zip codes as rows are appended to the CSV, reading only the appended bytes"""
+    tail = CsvTail(csv_file, state_file)
+    print(f"👀 Watching {csv_file} every {interval:g}s (state in {state_file}); Ctrl-C to stop")
+    first_cycle = True
+    try:
+        while True:
+            start = time.perf_counter()
+            new_zips = tail.poll()
+            if new_zips is not None:
+                how = 'Rescanned rewritten' if tail.rescanned else 'Read rows appended to'
+                print(f"\n📥 {how} {csv_file} in {time.perf_counter() - start:.2f}s: "
+                      f"{len(new_zips)} zip codes not seen before (offset {tail.offset})")
+            # The first cycle also catches up on zips a previous process saw but never geocoded
+            if first_cycle or new_zips:
+                cycle = replace(options, metrics=RunMetrics('watch_coordinates'))
+                update_coordinates(csv_file, json_file, cycle, csv_zips=set(tail.zip_codes))
+                write_metrics(cycle.metrics, metrics_json, metrics_prom)
+                if cycle.metrics.status != 'ok':
+                    return
+                first_cycle = False
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+def recheck_suspects(json_file: str, suspects_file: str, options: Optional[UpdateOptions] = None,
+                     limit: Optional[int] = None):
+    """Re-geocode only the zip codes validate_coordinates.py flagged, bypassing cached answers"""
+    options = options or UpdateOptions()
+    metrics = options.metrics or RunMetrics()
+    print("=== Re-geocoding Suspect Coordinates ===")
+    
+    with metrics.span('load_existing'):
+        existing_coords = load_existing_coordinates(json_file)
+        previous_failed = load_failed_zips(json_file)
+    suspects = [zip_code for zip_code in load_suspect_zips(suspects_file) if zip_code in existing_coords]
+    suspects = set(suspects[:limit] if limit else suspects)
+    if not suspects:
+        print("✅ No suspects with stored coordinates. Nothing to recheck.")
+        return
+    
+    journal_file = json_file + '.recheck' + JOURNAL_SUFFIX
+    replayed = replay_interrupted_run(journal_file, options)
+    if replayed is None:
+        metrics.status = 'blocked'
+        return
+    # Answers journaled by an interrupted recheck count as rechecked; they may not have been checkpointed
+    results = PendingResults(found={zip_code: entry for zip_code, entry in replayed[0].items()
+                                    if zip_code in existing_coords},
+                             failed=sorted(replayed[1]))
+    pending = suspects - set(replayed[0]) - replayed[1]
+    
+    if pending:
+        journal = CoordinateJournal(journal_file)
+        
+        def checkpoint():
+            journal.sync()
+            save_coordinates(json_file, {**existing_coords, **results.found}, sorted(previous_failed))
+        
+        with metrics.span('geocode'):
+            outcome = geocode_pending(pending, get_coordinates_from_zip, coordinate_entry, journal, results, options,
+                                      checkpoint, label='suspect zip codes', refresh=True)
+        if outcome is None:
+            return
+        journal.close()
+    
+    moved = {}
+    for zip_code, entry in results.found.items():
+        old = existing_coords[zip_code]
+        moved[zip_code] = haversine_miles(old['latitude'], old['longitude'], entry['latitude'], entry['longitude'])
+    
+    # A suspect the geocoder no longer answers for keeps its old coordinates
+    with metrics.span('write'):
+        save_coordinates(json_file, {**existing_coords, **results.found}, sorted(previous_failed),
+                         options.binary_file)
+        publish(json_file, options)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+    metrics.gauge('suspects_moved', sum(1 for miles in moved.values() if miles > 1))
+    
+    print(f"\n=== Recheck Complete ===")
+    print(f"🔁 Rechecked: {len(suspects)}")
+    print(f"📍 Moved by more than a mile: {sum(1 for miles in moved.values() if miles > 1)}")
+    print(f"❌ No answer now (kept old coordinates): {len(results.failed) + len(results.retry_later)}")
+    for zip_code, miles in sorted(moved.items(), key=lambda item: -item[1]):
+        if miles > 1:
+            print(f"   - {zip_code}: moved {miles:.0f} mi")
+
+@dataclass
+class KeyedCoordinates:
+    """A coordinates file keyed by a geocoder query string ("City, ST" or a normalized address)"""
+    label: str  # plural noun for messages and metric names
+    title: str
+    load: Callable[[str], Tuple[Dict[str, Dict], Set[str]]]
+    save: Callable[[str, Dict[str, Dict], list], None]
+    get_coordinates: Callable
+    make_entry: Callable[[tuple], Dict]
+    list_keys: bool = True  # print each new and failed key
+    fallback: str = ''  # what the map uses for keys that failed
+
+def update_keyed_coordinates(csv_file: Union[str, List[str]], json_file: str, kind: KeyedCoordinates,
+                             read_keys: Callable[[], Set[str]], inputs: List[str], options: UpdateOptions):
+    """Geocode the keys read_keys finds in the CSV that json_file doesn't have yet.
+
+    inputs are the files besides the CSV whose changes make a rerun worthwhile.
+    """
+    metrics = options.metrics or RunMetrics()
+    label = kind.label
+    print(f"=== Incremental {kind.title} Coordinate Update ===")
+    journal_file = json_file + JOURNAL_SUFFIX
+    fingerprints = input_fingerprints(json_file, csv_file, inputs, options)
+    if skip_unchanged(fingerprints, journal_file, options, metrics):
+        return
+    
+    with metrics.span('csv_read'):
+        csv_keys = read_keys()
+    
+    with metrics.span('load_existing'):
+        existing, previous_failed = kind.load(json_file)
+    print(f"Existing coordinates: {len(existing)} {label}")
+    
+    replayed = replay_interrupted_run(journal_file, options)
+    if replayed is None:
+        metrics.status = 'blocked'
+        return
+    existing.update(replayed[0])
+    replayed_failed = replayed[1]
+    
+    if options.prune:
+        with metrics.span('prune'):
+            prune_unreferenced(existing, csv_keys, [json_file],
+                               lambda kept: kind.save(json_file, kept, sorted(previous_failed & csv_keys)),
+                               label, metrics)
+    
+    with metrics.span('diff'):
+        new_keys = csv_keys - set(existing) - replayed_failed
+    metrics.gauge(f'new_{label}', len(new_keys))
+    
+    def merged_failures(found):
+        carried_over = (previous_failed & csv_keys) - new_keys
+        return sorted((set(results.failed) | carried_over) - set(existing) - set(found))
+    
+    results = PendingResults(failed=list(replayed_failed))
+    if not new_keys:
+        if os.path.exists(journal_file):
+            kind.save(json_file, existing, merged_failures({}))
+            os.remove(journal_file)
+        print(f"✅ No new {label} found. No update needed.")
+        publish(json_file, options)
+        fingerprints.record()
+        return
+    
+    print(f"🆕 Found {len(new_keys)} new {label} to process" + (":" if kind.list_keys else ""))
+    if kind.list_keys:
+        for key in sorted(new_keys):
+            print(f"   - {key}")
+    
+    journal = CoordinateJournal(journal_file)
+    
+    def checkpoint():
+        journal.sync()
+        kind.save(json_file, {**existing, **results.found}, merged_failures(results.found))
+    
+    with metrics.span('geocode'):
+        outcome = geocode_pending(new_keys, kind.get_coordinates, kind.make_entry, journal, results, options,
+                                  checkpoint, label=label)
+    if outcome is None:
+        return
+    
+    all_entries = {**existing, **results.found}
+    failed = merged_failures(results.found)
+    with metrics.span('write'):
+        kind.save(json_file, all_entries, failed)
+        journal.remove()
+        publish(json_file, options)
+        if results.retry_later:
+            fingerprints.clear()
+        else:
+            fingerprints.record()
+    metrics.gauge(f'total_{label}', len(all_entries))
+    
+    print(f"\n=== {kind.title} Update Complete ===")
+    print(f"✅ Successfully processed: {len(results.found)}/{len(new_keys)}")
+    print(f"❌ Failed (no result{f', {kind.fallback} used instead' if kind.fallback else ''}): {len(failed)}")
+    print(f"🔁 Try again later: {len(results.retry_later)}")
+    print(f"📊 Total {label}: {len(all_entries)}")
+    
+    if failed and kind.list_keys:
+        print(f"\nFailed {label}:")
+        for key in failed:
+            print(f"   - {key}")
+
+CITY_COORDINATES = KeyedCoordinates('cities', 'City', load_existing_city_coordinates, save_city_coordinates,
+                                    get_coordinates_from_city, city_entry)
+ADDRESS_COORDINATES = KeyedCoordinates('addresses', 'Address', load_existing_address_coordinates,
+                                       save_address_coordinates, get_coordinates_from_address, coordinate_entry,
+                                       list_keys=False, fallback='zip or city centroid')
+
+def update_city_coordinates(csv_file: Union[str, List[str]], city_json: str, zip_json: str,
+                            options: Optional[UpdateOptions] = None):
+    """Update "City, ST" fallback coordinates incrementally"""
+    options = options or UpdateOptions()
+    
+    # Cities are only needed for rows whose zip code has no coordinates
+    def read_keys():
+        usable_zips = set(load_existing_coordinates(zip_json))
+        return extract_city_keys_from_csv(csv_file, usable_zips, options.ingest_workers)
+    
+    update_keyed_coordinates(csv_file, city_json, CITY_COORDINATES, read_keys, [zip_json, city_json], options)
+
+def update_address_coordinates(csv_file: Union[str, List[str]], address_json: str,
+                               options: Optional[UpdateOptions] = None):
+    """Update street-address coordinates incrementally, one lookup per distinct normalized address"""
+    options = options or UpdateOptions()
+    
+    def read_keys():
+        paths = expand_csv_paths(csv_file)
+        print(f"Reading CSV file{'s' if len(paths) > 1 else ''}: {', '.join(paths)}")
+        keys = extract_address_keys(paths, options.ingest_workers)
+        print(f"Found {len(keys)} unique geocodable addresses in CSV")
+        (options.metrics or RunMetrics()).gauge('csv_unique_addresses', len(keys))
+        return keys
+    
+    update_keyed_coordinates(csv_file, address_json, ADDRESS_COORDINATES, read_keys, [address_json], options)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Fetch coordinates for zip codes that are new in the CSV.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'],
+                        help='organizations CSV files or glob patterns (.gz/.bz2 allowed)')
+    parser.add_argument('--ingest-workers', type=int, default=1,
+                        help='processes parsing the CSV in parallel byte ranges (0 = one per CPU)')
+    parser.add_argument('--json', default='zip_coordinates.json', help='coordinates JSON file to update')
+    parser.add_argument('--cities', action='store_true',
+                        help='update city_coordinates.json for rows without a usable zip code instead')
+    parser.add_argument('--addresses', action='store_true',
+                        help='geocode street addresses into --address-json instead (zip and city centroids stay the fallback)')
+    parser.add_argument('--address-json', default='address_coordinates.json', help='address coordinates JSON file')
+    parser.add_argument('--recheck-suspects', metavar='FILE',
+                        help='re-geocode only the zip codes in a validate_coordinates.py suspect list instead')
+    parser.add_argument('--max-suspects', type=int, help='recheck at most this many of the worst suspects')
+    parser.add_argument('--stream', action='store_true',
+                        help='geocode zip codes while the CSV is still being read, writing results as they arrive')
+    parser.add_argument('--queue-size', type=int,
+                        help='zip codes and results buffered between streaming stages (default: 4 per worker)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running, geocoding zip codes from rows appended to the (single, uncompressed) CSV')
+    parser.add_argument('--watch-interval', type=float, default=2.0, help='seconds between checks of the CSV')
+    parser.add_argument('--watch-state', help='where to keep the read offset and fingerprint '
+                                              '(default: the CSV path with .watch.json)')
+    parser.add_argument('--city-json', default='city_coordinates.json', help='city coordinates JSON file')
+    parser.add_argument('--geocoder-url', default=NOMINATIM_URL,
+                        help='Nominatim-compatible search endpoint (e.g. a local stub_geocoder.py)')
+    parser.add_argument('--secondary-geocoder-url',
+                        help='geocoder to ask when the primary has no answer or keeps failing')
+    parser.add_argument('--secondary-rate', type=float, default=1.0,
+                        help='max requests per second to the secondary geocoder, 0 for unlimited')
+    parser.add_argument('--hedge-after', type=float,
+                        help='seconds to wait on the primary before also asking the secondary (needs a secondary); '
+                             'requests that lose the race still finish, within each geocoder\'s rate limit')
+    parser.add_argument('--workers', type=int, default=4, help='requests kept in flight')
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='max requests started per second, 0 for unlimited (default: 1, per Nominatim policy)')
+    parser.add_argument('--burst', type=int, default=1, help='token bucket size')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='attempts per request on timeouts, connection errors and 5xx answers')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help='geocode cache database')
+    parser.add_argument('--no-cache', action='store_true', help='always ask the geocoder')
+    parser.add_argument('--ok-ttl-days', type=float, default=365, help='how long found coordinates are cached')
+    parser.add_argument('--miss-ttl-days', type=float, default=90, help='how long "no result" answers are cached')
+    parser.add_argument('--error-ttl-minutes', type=float, default=60, help='how long transient errors are cached')
+    parser.add_argument('--checkpoint-every', type=int, default=100,
+                        help='atomically rewrite the JSON after this many results (0 to only write at the end)')
+    parser.add_argument('--resume', action='store_true', help='replay the journal of an interrupted run and continue')
+    parser.add_argument('--gazetteer', help='local ZCTA gazetteer TSV/CSV to resolve zip codes from before geocoding')
+    parser.add_argument('--offline', action='store_true',
+                        help='use only the gazetteer; leave zip codes it does not cover for a later run')
+    parser.add_argument('--binary', help='compact binary artifact to write alongside the JSON '
+                                         '(default: the JSON path with a .bin extension)')
+    parser.add_argument('--no-binary', action='store_true', help='only write the JSON file')
+    parser.add_argument('--metrics-json', help='write a JSON run report (spans, counters, latency histogram) here')
+    parser.add_argument('--metrics-prom',
+                        help='write Prometheus metrics here (e.g. into the node_exporter textfile directory)')
+    parser.add_argument('--publish', metavar='DIR',
+                        help='also publish a content-hashed version, manifest and deltas into DIR (e.g. dist)')
+    parser.add_argument('--force', action='store_true',
+                        help='run even if the CSV and coordinate files are unchanged since the last complete run')
+    parser.add_argument('--prune', action='store_true',
+                        help='drop stored coordinates that no CSV row references and report the bytes saved')
+    args = parser.parse_args(argv)
+    if args.hedge_after is not None and not args.secondary_geocoder_url:
+        parser.error('--hedge-after needs --secondary-geocoder-url')
+    if args.stream and (args.cities or args.addresses or args.recheck_suspects or args.watch or args.offline):
+        parser.error('--stream does not combine with --cities, --addresses, --recheck-suspects, --watch or --offline')
+    if args.watch and (len(args.csv) != 1 or args.csv[0].endswith(('.gz', '.bz2'))):
+        parser.error('--watch needs a single uncompressed CSV file')
+    return args
 
 def main():
-    csv_file = "01_master_all_states.csv"
-    json_file = "zip_coordinates.json"
+    args = parse_args()
+    csv_file = args.csv
+    json_file = args.json
+    options = UpdateOptions(
+        geocoder_url=args.geocoder_url,
+        secondary_geocoder_url=args.secondary_geocoder_url,
+        secondary_rate=args.secondary_rate or None,
+        hedge_after=args.hedge_after,
+        workers=args.workers,
+        rate=args.rate or None,
+        burst=args.burst,
+        max_attempts=args.max_attempts,
+        cache_file=None if args.no_cache else args.cache,
+        cache_ttls={
+            STATUS_OK: args.ok_ttl_days * DAY,
+            STATUS_NO_RESULT: args.miss_ttl_days * DAY,
+            STATUS_ERROR: args.error_ttl_minutes * 60
+        },
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        gazetteer_file=args.gazetteer,
+        offline=args.offline,
+        binary_file=None if args.no_binary else (args.binary or os.path.splitext(json_file)[0] + '.bin'),
+        publish_dir=args.publish,
+        ingest_workers=args.ingest_workers or os.cpu_count() or 1,
+        force=args.force,
+        prune=args.prune,
+        queue_size=args.queue_size,
+        metrics=RunMetrics('update_city_coordinates' if args.cities else
+                           'update_address_coordinates' if args.addresses else
+                           'recheck_suspects' if args.recheck_suspects else 'update_coordinates')
+    )
     
     try:
-        update_coordinates(csv_file, json_file)
-    except FileNotFoundError:
-        print(f"❌ Error: CSV file '{csv_file}' not found!")
+        if args.cities:
+            update_city_coordinates(csv_file, args.city_json, json_file, options)
+        elif args.addresses:
+            update_address_coordinates(csv_file, args.address_json, options)
+        elif args.recheck_suspects:
+            recheck_suspects(json_file, args.recheck_suspects, options, args.max_suspects)
+        elif args.watch:
+            watch_coordinates(csv_file[0], json_file, options, args.watch_state or csv_file[0] + '.watch.json',
+                              args.watch_interval, args.metrics_json, args.metrics_prom)
+            return
+        elif args.stream:
+            stream_coordinates(csv_file, json_file, options)
+        else:
+            update_coordinates(csv_file, json_file, options)
+    except FileNotFoundError as e:
+        options.metrics.status = 'error'
+        print(f"❌ Error: CSV file '{e.filename}' not found!")
         print("Make sure the CSV file is in the same directory as this script.")
     except Exception as e:
+        options.metrics.status = 'error'
         print(f"❌ Error: {e}")
+    write_metrics(options.metrics, args.metrics_json, args.metrics_prom)
 
 if __name__ == "__main__":
     main()
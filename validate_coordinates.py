@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Bulk quality check of stored zip coordinates.
+One vectorized pass flags coordinates that fall outside the bounding box of
+the state the CSV puts the zip in, or far from the other zips sharing its
+ZIP3 prefix, and writes a ranked suspect list for
+update_coordinates.py --recheck-suspects.
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from checkpoint import write_json_atomic
+from csv_ingest import expand_csv_paths
+from infer_coordinates import zip_places
+from proximity import haversine_miles_np
+
+# (south, west, north, east) in degrees
+STATE_BOUNDS = {
+    'AL': (30.14, -88.47, 35.01, -84.89), 'AK': (51.2, -180.0, 71.4, -129.98),
+    'AZ': (31.33, -114.82, 37.0, -109.04), 'AR': (33.0, -94.62, 36.5, -89.64),
+    'CA': (32.53, -124.41, 42.01, -114.13), 'CO': (36.99, -109.06, 41.0, -102.04),
+    'CT': (40.98, -73.73, 42.05, -71.79), 'DE': (38.45, -75.79, 39.84, -75.05),
+    'DC': (38.79, -77.12, 38.99, -76.91), 'FL': (24.4, -87.63, 31.0, -80.03),
+    'GA': (30.36, -85.61, 35.0, -80.84), 'HI': (18.91, -160.25, 22.24, -154.81),
+    'ID': (41.99, -117.24, 49.0, -111.04), 'IL': (36.97, -91.51, 42.51, -87.02),
+    'IN': (37.77, -88.1, 41.76, -84.78), 'IA': (40.38, -96.64, 43.5, -90.14),
+    'KS': (36.99, -102.05, 40.0, -94.59), 'KY': (36.5, -89.57, 39.15, -81.96),
+    'LA': (28.93, -94.04, 33.02, -88.82), 'ME': (43.06, -71.08, 47.46, -66.95),
+    'MD': (37.91, -79.49, 39.72, -75.05), 'MA': (41.24, -73.51, 42.89, -69.93),
+    'MI': (41.7, -90.42, 48.31, -82.41), 'MN': (43.5, -97.24, 49.38, -89.49),
+    'MS': (30.17, -91.66, 35.0, -88.1), 'MO': (35.99, -95.77, 40.61, -89.1),
+    'MT': (44.36, -116.05, 49.0, -104.04), 'NE': (40.0, -104.05, 43.0, -95.31),
+    'NV': (35.0, -120.01, 42.0, -114.04), 'NH': (42.7, -72.56, 45.31, -70.6),
+    'NJ': (38.93, -75.56, 41.36, -73.89), 'NM': (31.33, -109.05, 37.0, -103.0),
+    'NY': (40.5, -79.76, 45.02, -71.86), 'NC': (33.84, -84.32, 36.59, -75.46),
+    'ND': (45.94, -104.05, 49.0, -96.55), 'OH': (38.4, -84.82, 41.98, -80.52),
+    'OK': (33.62, -103.0, 37.0, -94.43), 'OR': (41.99, -124.57, 46.29, -116.46),
+    'PA': (39.72, -80.52, 42.27, -74.69), 'RI': (41.15, -71.86, 42.02, -71.12),
+    'SC': (32.03, -83.35, 35.22, -78.54), 'SD': (42.48, -104.06, 45.95, -96.44),
+    'TN': (34.98, -90.31, 36.68, -81.65), 'TX': (25.84, -106.65, 36.5, -93.51),
+    'UT': (36.99, -114.05, 42.0, -109.04), 'VT': (42.73, -73.44, 45.02, -71.46),
+    'VA': (36.54, -83.68, 39.47, -75.24), 'WA': (45.54, -124.85, 49.0, -116.92),
+    'WV': (37.2, -82.64, 40.64, -77.72), 'WI': (42.49, -92.89, 47.31, -86.25),
+    'WY': (40.99, -111.06, 45.01, -104.05), 'PR': (17.88, -67.95, 18.52, -65.22),
+    'VI': (17.67, -65.09, 18.42, -64.56), 'GU': (13.23, 144.62, 13.65, 144.96)
+}
+BOX_MARGIN_DEGREES = 0.25  # zip centroids near a border can sit just outside it
+ZIP3_MIN_SIBLINGS = 3
+ZIP3_FLOOR_MILES = 75.0  # never flag a zip closer than this to its ZIP3 median
+ZIP3_SPREAD_FACTOR = 4.0  # ... or closer than this many times the typical sibling distance
+
+def group_medians(values: np.ndarray, groups: np.ndarray, group_count: int) -> np.ndarray:
+    """Median (lower middle) of values within each group, without a Python loop over groups"""
+    order = np.lexsort((values, groups))
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return values[order][starts + (counts - 1) // 2]
+
+def state_box_miles(lats: np.ndarray, lons: np.ndarray, states: List[str]) -> np.ndarray:
+    """Miles outside the (padded) bounding box of each point's state; 0 inside or for unknown states"""
+    bounds = np.array([STATE_BOUNDS.get(state, (np.nan,) * 4) for state in states], dtype=np.float64).reshape(-1, 4)
+    south, west = bounds[:, 0] - BOX_MARGIN_DEGREES, bounds[:, 1] - BOX_MARGIN_DEGREES
+    north, east = bounds[:, 2] + BOX_MARGIN_DEGREES, bounds[:, 3] + BOX_MARGIN_DEGREES
+    nearest_lat = np.clip(lats, south, north)
+    nearest_lon = np.clip(lons, west, east)
+    miles = haversine_miles_np(lats, lons, nearest_lat, nearest_lon)
+    return np.where(np.isnan(bounds[:, 0]), 0.0, miles)
+
+def validate_coordinates(coordinates: Dict[str, Dict[str, float]],
+                         zip_states: Dict[str, str]) -> List[Dict]:
+    """Suspect entries, worst first"""
+    zip_codes = sorted(coordinates)
+    if not zip_codes:
+        return []
+    lats = np.array([coordinates[zip_code]['latitude'] for zip_code in zip_codes], dtype=np.float64)
+    lons = np.array([coordinates[zip_code]['longitude'] for zip_code in zip_codes], dtype=np.float64)
+    states = [zip_states.get(zip_code, '') for zip_code in zip_codes]
+
+    outside_miles = state_box_miles(lats, lons, states)
+
+    prefixes, groups = np.unique([zip_code[:3] for zip_code in zip_codes], return_inverse=True)
+    siblings = np.bincount(groups, minlength=len(prefixes))[groups]
+    median_lats = group_medians(lats, groups, len(prefixes))[groups]
+    median_lons = group_medians(lons, groups, len(prefixes))[groups]
+    zip3_miles = haversine_miles_np(lats, lons, median_lats, median_lons)
+    typical_miles = group_medians(zip3_miles, groups, len(prefixes))[groups]
+    zip3_limit = np.maximum(ZIP3_FLOOR_MILES, ZIP3_SPREAD_FACTOR * typical_miles)
+    zip3_excess = np.where(siblings >= ZIP3_MIN_SIBLINGS, np.maximum(0.0, zip3_miles - zip3_limit), 0.0)
+
+    score = np.maximum(outside_miles, zip3_excess)
+    suspects = []
+    for i in np.argsort(-score, kind='stable'):
+        if score[i] <= 0:
+            break
+        reasons = []
+        if outside_miles[i] > 0:
+            reasons.append(f"{outside_miles[i]:.0f} mi outside {states[i]}")
+        if zip3_excess[i] > 0:
+            reasons.append(f"{zip3_miles[i]:.0f} mi from {zip_codes[i][:3]}xx median (limit {zip3_limit[i]:.0f})")
+        suspects.append({
+            'zip': zip_codes[i],
+            'latitude': float(lats[i]),
+            'longitude': float(lons[i]),
+            'state': states[i],
+            'score': round(float(score[i]), 1),
+            'reasons': reasons
+        })
+    return suspects
+
+def load_suspect_zips(suspects_file: str) -> List[str]:
+    """Zip codes from a suspect list, worst first"""
+    with open(suspects_file, 'r', encoding='utf-8') as file:
+        return [suspect['zip'] for suspect in json.load(file).get('suspects', [])]
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag zip coordinates that look misplaced.')
+    parser.add_argument('--csv', nargs='+', default=['01_master_all_states.csv'], help='organizations CSV files or globs')
+    parser.add_argument('--zip-json', default='zip_coordinates.json')
+    parser.add_argument('--output', default='coordinate_suspects.json')
+    parser.add_argument('--top', type=int, default=20, help='suspects to print')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.zip_json, 'r', encoding='utf-8') as file:
+        coordinates = json.load(file).get('coordinates', {})
+    zip_states = {zip_code: place[1] for zip_code, place in zip_places(expand_csv_paths(args.csv)).items()}
+    suspects = validate_coordinates(coordinates, zip_states)
+    write_json_atomic(args.output, {
+        'metadata': {
+            'checked': len(coordinates),
+            'suspects': len(suspects),
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': 'Score is miles beyond the state box or ZIP3 spread limit; worst first'
+        },
+        'suspects': suspects
+    })
+    print(f"Checked {len(coordinates)} coordinates in {time.perf_counter() - start:.2f}s")
+    print(f"⚠️  {len(suspects)} suspects written to {args.output}")
+    for suspect in suspects[:args.top]:
+        print(f"   {suspect['zip']} {suspect['score']:>7.1f}  {'; '.join(suspect['reasons'])}")
+
+if __name__ == "__main__":
+    main()